@@ -1,17 +1,152 @@
-from flask import Flask, request, jsonify
+import json
+import logging
+import os
+import random
+import time
+
+from flask import Flask, Response, request, jsonify
+from batch import solve_batch
 from generate_timetable import solve_timetable
+from jobs import JobManager, JobQueueFull
+from metrics import Metrics
+from replan import replan_timetable
+from response_format import gzip_body
+from result_cache import ResultCache
 
 app = Flask(__name__)
 
+logging.basicConfig(level=os.environ.get("TIMETABLE_LOG_LEVEL", "INFO"), format="%(message)s")
+logger = logging.getLogger("timetable")
+# Share of requests whose full payload and result are logged next to the summary line
+LOG_SAMPLE_RATE = float(os.environ.get("TIMETABLE_LOG_SAMPLE_RATE", 0.01))
+
+metrics = Metrics()
+
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("TIMETABLE_CACHE_SIZE", 128)),
+    directory=os.environ.get("TIMETABLE_CACHE_DIR") or None,
+)
+
+_job_manager = None
+
+
+def job_manager():
+    # Created on first use so that importing the app does not spawn solver processes
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(max_workers=int(os.environ.get("TIMETABLE_JOB_WORKERS", 2)))
+    return _job_manager
+
+
+def log_request(endpoint, data, result, duration):
+    """One JSON line per request; the payload and result only for a sample of them."""
+    solver = result.get("solver", {})
+    record = {
+        "event": endpoint,
+        "sections": len(data.get("sections", [])) if isinstance(data, dict) else None,
+        "status": result["status"],
+        "solver_status": solver.get("status"),
+        "objective": solver.get("objective"),
+        "duration": round(duration, 3),
+    }
+    if random.random() < LOG_SAMPLE_RATE:
+        record["payload"] = data
+        record["result"] = result
+    logger.info(json.dumps(record))
+
+
+def finish(endpoint, data, result, started, code=200):
+    duration = time.perf_counter() - started
+    metrics.inc("timetable_requests_total", {"endpoint": endpoint, "code": code})
+    metrics.observe("timetable_request_duration_seconds", duration, {"endpoint": endpoint})
+    log_request(endpoint, data, result, duration)
+    response = jsonify(result)
+    if isinstance(data, dict) and data.get("gzip") and "gzip" in request.accept_encodings:
+        response.set_data(gzip_body(response.get_data()))
+        response.headers["Content-Encoding"] = "gzip"
+        response.headers["Vary"] = "Accept-Encoding"
+    return response, code
+
 @app.route('/generate-timetable', methods=['POST'])
 def generate():
+    started = time.perf_counter()
+    data = request.json
+    try:
+        result = solve_timetable(data, cache=result_cache, metrics=metrics)
+    except ValueError as exc:
+        return finish("generate", data, {"status": "failed", "message": str(exc)}, started, 400)
+    if result["status"] == "failed":
+        return finish("generate", data, result, started, 400)
+    return finish("generate", data, result, started)
+
+@app.route('/generate-timetable/batch', methods=['POST'])
+def generate_batch():
+    started = time.perf_counter()
+    data = request.json
+    try:
+        result = solve_batch(data)
+    except ValueError as exc:
+        return finish("batch", data, {"status": "failed", "message": str(exc)}, started, 400)
+    return finish("batch", data, result, started)
+
+@app.route('/replan-timetable', methods=['POST'])
+def replan():
+    started = time.perf_counter()
     data = request.json
-    print("Received data:", data)
-    result = solve_timetable(data)
-    print("Generated result:", result)
+    try:
+        result = replan_timetable(data)
+    except (KeyError, ValueError) as exc:
+        return finish("replan", data, {"status": "failed", "message": f"Invalid re-plan request: {exc}"}, started, 400)
     if result["status"] == "failed":
-        return jsonify(result), 400
-    return jsonify(result)
+        return finish("replan", data, result, started, 400)
+    return finish("replan", data, result, started)
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    stats = result_cache.stats()
+    metrics.set("timetable_cache_entries", stats["entries"])
+    for outcome in ("hits", "misses", "near_hits"):
+        metrics.set("timetable_cache_lookups_total", stats[outcome], {"outcome": outcome})
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        job = job_manager().submit(request.json)
+    except JobQueueFull as exc:
+        return jsonify({"status": "failed", "message": str(exc)}), 503
+    metrics.inc("timetable_jobs_submitted_total")
+    return jsonify({"job_id": job.job_id, "status": job.status}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager().get(job_id)
+    if job is None:
+        return jsonify({"status": "failed", "message": "Unknown job."}), 404
+    return jsonify(job.snapshot())
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    job = job_manager().get(job_id)
+    if job is None:
+        return jsonify({"status": "failed", "message": "Unknown job."}), 404
+
+    def events():
+        for kind, payload in job_manager().stream(job):
+            yield f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({"status": "failed", "message": "Unknown job."}), 404
+    return jsonify(job.snapshot()), 202
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,55 @@
+import os
+import time
+
+from decompose import worker_pool
+from generate_timetable import solve_timetable
+
+
+def solve_problem(problem):
+    # Pool entry point; wall-clock stamps so the caller can tell queueing from solving
+    started = time.time()
+    try:
+        response = solve_timetable(problem)
+    except ValueError as exc:
+        response = {"status": "failed", "message": str(exc)}
+    except Exception as exc:  # a malformed payload fails its own entry, not the whole batch
+        response = {"status": "failed", "message": f"Invalid problem: {type(exc).__name__}: {exc}"}
+    return response, started, time.time()
+
+
+def solve_batch(batch):
+    """Solve every problem of a batch payload in the shared worker pool.
+
+    `batch` is {"problems": [payload, ...], "alternatives": N}, each payload in the
+    /generate-timetable schema. `alternatives` applies to every problem that does
+    not set its own in "solver". The cores are split between the problems, which
+    replaces decomposing each of them. Responses come back in `problems` order,
+    each with its "timing": seconds spent queued in the pool and solving.
+    """
+    problems = batch.get("problems") if isinstance(batch, dict) else None
+    if not isinstance(problems, list) or not problems or not all(isinstance(p, dict) for p in problems):
+        raise ValueError("problems must be a non-empty list of timetable payloads")
+    alternatives = batch.get("alternatives", 1)
+    num_workers = max(1, (os.cpu_count() or 1) // len(problems))
+
+    submitted = time.time()
+    futures = []
+    for problem in problems:
+        solver = dict({"num_workers": num_workers, "alternatives": alternatives}, **(problem.get("solver") or {}))
+        solver["decompose"] = False
+        futures.append(worker_pool().submit(solve_problem, dict(problem, solver=solver)))
+
+    results = []
+    for future in futures:
+        response, started, finished = future.result()
+        response["timing"] = {"queued": started - submitted, "solve_time": finished - started}
+        results.append(response)
+
+    solved = sum(1 for response in results if response["status"] == "success")
+    if solved == len(results):
+        status = "success"
+    elif solved:
+        status = "partial"
+    else:
+        status = "failed"
+    return {"status": status, "results": results, "wall_time": time.time() - submitted}
@@ -0,0 +1,232 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ortools.sat.python import cp_model
+from tabulate import tabulate
+
+from generate_timetable import configure_solver, solver_options, solver_report
+from response_format import compact_timetable, gzip_body
+from staged import solve_staged
+from synthetic import generate_problem
+from timetable_model import TimetableModel
+
+DEFAULT_SWEEP = (3, 6, 12, 24, 36, 48, 60)
+GENERATOR_FIELDS = ("courses_per_section", "teacher_sharing", "lab_fraction", "room_tightness", "seed")
+METRIC_FIELDS = (
+    "variables", "constraints", "build_time", "first_solution_time", "optimal_time",
+    "status", "objective", "best_bound", "wall_time", "extract_time", "serialize_time", "response_bytes", "peak_rss_mb",
+)
+RESPONSE_FORMATS = ("nested", "compact", "gzip")
+FIELDS = ("name", "sections") + GENERATOR_FIELDS + METRIC_FIELDS
+# Metrics compared against a baseline; a run regresses when it is more than
+# `tolerance` worse and, for times, at least MIN_TIME_DELTA seconds slower
+COMPARED = (
+    "build_time", "first_solution_time", "optimal_time", "objective", "variables", "constraints",
+    "extract_time", "serialize_time", "response_bytes",
+)
+MIN_TIME_DELTA = 0.1
+
+
+class FirstSolutionTimer(cp_model.CpSolverSolutionCallback):
+    def __init__(self):
+        super().__init__()
+        self.first_solution_time = None
+
+    def on_solution_callback(self):
+        if self.first_solution_time is None:
+            self.first_solution_time = self.WallTime()
+
+
+def instance_name(params):
+    return "s{sections}-c{courses_per_section}-t{teacher_sharing}-l{lab_fraction}-r{room_tightness}-seed{seed}".format(**params)
+
+
+def serialize(timetable_model, timetable, response_format):
+    """(seconds, bytes) to turn `timetable` into a response body the way jsonify does in production."""
+    start = time.perf_counter()
+    if response_format != "nested":
+        timetable = compact_timetable(timetable_model.problem, timetable)
+    body = json.dumps({"timetable": timetable}, separators=(",", ":"), sort_keys=True).encode()
+    if response_format == "gzip":
+        body = gzip_body(body)
+    return time.perf_counter() - start, len(body)
+
+
+def run_instance(params, solver, build_only=False, response_format="nested"):
+    """Generate, build and solve one instance; runs in its own process so peak RSS is per instance."""
+    data = generate_problem(**params)
+    data["solver"] = solver
+    options = solver_options(data)
+
+    start = time.perf_counter()
+    timetable_model = TimetableModel(data, strengthen=options["strengthen"]).build()
+    build_time = time.perf_counter() - start
+    proto = timetable_model.model.Proto()
+    if build_only:
+        return dict(
+            params,
+            name=instance_name(params),
+            variables=len(proto.variables),
+            constraints=len(proto.constraints),
+            build_time=build_time,
+            status="NOT_SOLVED",
+            peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        )
+
+    if options["staged"]:
+        start = time.perf_counter()
+        first_solution = []
+        response, staging = solve_staged(data, options, lambda solution: first_solution or first_solution.append(time.perf_counter() - start))
+        if response is not None:
+            report = response["solver"]
+            serialize_time, response_bytes = serialize(timetable_model, response["timetable"], response_format)
+            return dict(
+                params,
+                name=instance_name(params),
+                variables=len(proto.variables),
+                constraints=len(proto.constraints),
+                build_time=build_time,
+                first_solution_time=first_solution[0],
+                optimal_time=report["wall_time"] if report["status"] == "OPTIMAL" else None,
+                status=report["status"],
+                objective=report["objective"],
+                best_bound=report["best_bound"],
+                wall_time=report["wall_time"],
+                serialize_time=serialize_time,
+                response_bytes=response_bytes,
+                peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            )
+        # Staging failed: the joint model gets the rest of the time limit
+        if options["max_time_in_seconds"] is not None:
+            options["max_time_in_seconds"] = max(options["max_time_in_seconds"] - (time.perf_counter() - start), 0.0)
+
+    cp_solver = cp_model.CpSolver()
+    configure_solver(cp_solver, options)
+    timer = FirstSolutionTimer()
+    status = cp_solver.Solve(timetable_model.model, timer)
+    solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    report = solver_report(cp_solver, status, options)
+    extract_time = serialize_time = response_bytes = None
+    if solved:
+        start = time.perf_counter()
+        timetable = timetable_model.extract(cp_solver)
+        extract_time = time.perf_counter() - start
+        serialize_time, response_bytes = serialize(timetable_model, timetable, response_format)
+
+    return dict(
+        params,
+        name=instance_name(params),
+        variables=len(proto.variables),
+        constraints=len(proto.constraints),
+        build_time=build_time,
+        first_solution_time=timer.first_solution_time,
+        optimal_time=cp_solver.WallTime() if report["status"] == "OPTIMAL" else None,
+        status=report["status"],
+        objective=cp_solver.ObjectiveValue() if solved else None,
+        best_bound=cp_solver.BestObjectiveBound() if solved else None,
+        wall_time=cp_solver.WallTime(),
+        extract_time=extract_time,
+        serialize_time=serialize_time,
+        response_bytes=response_bytes,
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    )
+
+
+def run_sweep(instances, solver, build_only=False, response_format="nested"):
+    # One fresh process per instance: ru_maxrss only ever grows within a process
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as pool:
+        for params in instances:
+            result = pool.submit(run_instance, params, solver, build_only, response_format).result()
+            print(f"{result['name']}: {result['status']} objective={result.get('objective')} "
+                  f"build={result['build_time']:.2f}s wall={result.get('wall_time') or 0:.2f}s", file=sys.stderr)
+            results.append(result)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Rows of (instance, metric, baseline, current, ratio, regressed) for every compared metric."""
+    previous = {result["name"]: result for result in baseline}
+    rows = []
+    for result in results:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        for metric in COMPARED:
+            before, after = old.get(metric), result.get(metric)
+            if before is None and after is None:
+                continue
+            if before is None or after is None:
+                # Gained or lost a solution / proof within the time limit
+                rows.append((result["name"], metric, before, after, None, after is None))
+                continue
+            ratio = after / before if before else (1.0 if after == before else float("inf"))
+            regressed = after > before * (1 + tolerance)
+            if metric.endswith("_time"):
+                regressed = regressed and after - before >= MIN_TIME_DELTA
+            rows.append((result["name"], metric, before, after, ratio, regressed))
+    return rows
+
+
+def write_csv(results, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for result in results:
+            writer.writerow({field: result.get(field) for field in FIELDS})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling benchmark for the timetable model on synthetic departments.")
+    parser.add_argument("--sections", type=int, nargs="+", default=list(DEFAULT_SWEEP))
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1])
+    parser.add_argument("--courses-per-section", type=int, default=6)
+    parser.add_argument("--teacher-sharing", type=float, default=0.5)
+    parser.add_argument("--lab-fraction", type=float, default=0.3)
+    parser.add_argument("--room-tightness", type=float, default=0.5)
+    parser.add_argument("--time-limit", type=float, default=60.0, help="CP-SAT time limit per instance, in seconds")
+    parser.add_argument("--workers", type=int, default=0, help="CP-SAT workers per instance (0 = every core)")
+    parser.add_argument("--staged", action="store_true", help="place the labs first (see staged.solve_staged)")
+    parser.add_argument("--strengthen", nargs="*", default=[], help="strengthenings to add (see timetable_model.STRENGTHENINGS)")
+    parser.add_argument("--response-format", choices=RESPONSE_FORMATS, default="nested", help="response encoding to time and measure")
+    parser.add_argument("--build-only", action="store_true", help="only build the models, to measure construction")
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--csv", help="write the results here as CSV")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative slack before a metric counts as a regression")
+    args = parser.parse_args()
+
+    instances = [
+        {
+            "sections": sections, "courses_per_section": args.courses_per_section, "teacher_sharing": args.teacher_sharing,
+            "lab_fraction": args.lab_fraction, "room_tightness": args.room_tightness, "seed": seed,
+        }
+        for sections in args.sections
+        for seed in args.seeds
+    ]
+    # Fixed seed so baseline and candidate runs search the same way
+    solver = {"max_time_in_seconds": args.time_limit, "num_workers": args.workers, "random_seed": 1, "strengthen": args.strengthen, "staged": args.staged}
+    results = run_sweep(instances, solver, args.build_only, args.response_format)
+
+    summary = ("name", "sections") + METRIC_FIELDS
+    print(tabulate([[result.get(field) for field in summary] for result in results], headers=summary, floatfmt=".2f"))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"solver": solver, "response_format": args.response_format, "results": results}, f, indent=2)
+    if args.csv:
+        write_csv(results, args.csv)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(results, json.load(f)["results"], args.tolerance)
+        print()
+        print(tabulate(rows, headers=["instance", "metric", "baseline", "current", "ratio", "regressed"], floatfmt=".2f"))
+        if any(row[-1] for row in rows):
+            sys.exit(1)
@@ -0,0 +1,86 @@
+import numpy as np
+
+
+class CompiledProblem:
+    """A payload mapped to dense integer ids, with its per-cell data as NumPy arrays.
+
+    Sections, days, slots and lab pairs are numbered in payload order; courses in
+    `course_req` order followed by the labs; teachers in sorted order. Index
+    arrays answer "which sections does this teacher teach" without scanning every
+    section, which is what keeps model construction linear in the payload size.
+    """
+
+    def __init__(self, data, days, time_slots, lab_pairs, blocked_cells):
+        self.sections = list(data["sections"])
+        lab_names = list(data["all_lab_course_names"])
+        self.courses = [c for c in data["course_req"] if c not in lab_names] + lab_names
+        self.teachers = sorted({t for sec in self.sections for t in data["section_course_teacher"][sec].values() if t})
+        self.days = list(days)
+        self.time_slots = list(time_slots)
+        self.lab_pairs = [tuple(pair) for pair in lab_pairs]
+
+        self.section_id = {sec: i for i, sec in enumerate(self.sections)}
+        self.course_id = {course: i for i, course in enumerate(self.courses)}
+        self.teacher_id = {teacher: i for i, teacher in enumerate(self.teachers)}
+        self.day_id = {d: i for i, d in enumerate(self.days)}
+        self.slot_id = {slot: i for i, slot in enumerate(self.time_slots)}
+
+        num_sections, num_courses = len(self.sections), len(self.courses)
+        num_days, num_slots = len(self.days), len(self.time_slots)
+
+        # Courses: sessions a section taking the course needs; lab sessions fill two slots
+        self.is_lab = np.array([c in lab_names for c in self.courses], dtype=bool)
+        self.sessions = np.array([
+            # A catalog lab no section takes may come without a session count
+            data["lab_course_sessions_needed"].get(c, 0) if lab else data["course_req"][c]
+            for c, lab in zip(self.courses, self.is_lab)
+        ], dtype=np.int32)
+
+        # Section x course: the teaching teacher's id, -1 if the section does not take it
+        self.teacher_of = np.full((num_sections, num_courses), -1, dtype=np.int32)
+        for s, sec in enumerate(self.sections):
+            for course, teacher in data["section_course_teacher"][sec].items():
+                if teacher and course in self.course_id:
+                    self.teacher_of[s, self.course_id[course]] = self.teacher_id[teacher]
+        self.required_slots = ((self.teacher_of >= 0) * self.sessions * np.where(self.is_lab, 2, 1)).sum(axis=1)
+
+        # Teacher -> sections they teach, in section order
+        self.teacher_sections = [np.empty(0, dtype=np.int32)] * len(self.teachers)
+        sections_of, courses_of = np.nonzero(self.teacher_of >= 0)
+        taught = self.teacher_of[sections_of, courses_of]
+        for t in np.unique(taught):
+            self.teacher_sections[t] = np.unique(sections_of[taught == t])
+
+        # Day x slot grid
+        self.usable = np.ones((num_days, num_slots), dtype=bool)
+        for d, slot in blocked_cells:
+            if d in self.day_id and slot in self.slot_id:
+                self.usable[self.day_id[d], self.slot_id[slot]] = False
+        self.pair_of_slot = np.full(num_slots, -1, dtype=np.int32)
+        for p, pair in enumerate(self.lab_pairs):
+            for slot in pair:
+                self.pair_of_slot[self.slot_id[slot]] = p
+
+        self.classrooms = np.full((num_days, num_slots), data["num_of_classrooms"], dtype=np.int32)
+        for d, slots in data.get("classroom_capacity", {}).items():
+            for slot, rooms in slots.items():
+                self.classrooms[self.day_id[d], self.slot_id[slot]] = rooms
+        self.labrooms = np.full((num_days, len(self.lab_pairs)), data["num_of_labrooms"], dtype=np.int32)
+        first_slots = {pair[0]: p for p, pair in enumerate(self.lab_pairs)}
+        for d, slots in data.get("labroom_capacity", {}).items():
+            for slot, rooms in slots.items():
+                self.labrooms[self.day_id[d], first_slots[slot]] = rooms
+
+        # Teacher x day x slot; entries naming unknown teachers, days or slots are ignored
+        self.unavailable = np.zeros((len(self.teachers), num_days, num_slots), dtype=bool)
+        for entry in data.get("teacher_unavailable", []):
+            t = self.teacher_id.get(entry["teacher"])
+            if t is None:
+                continue
+            days = [self.day_id[entry["day"]]] if entry.get("day") in self.day_id else []
+            slots = [self.slot_id[entry["slot"]]] if entry.get("slot") in self.slot_id else []
+            self.unavailable[
+                t,
+                days if entry.get("day") else slice(None),
+                slots if entry.get("slot") else slice(None),
+            ] = True
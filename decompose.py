@@ -0,0 +1,248 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from timetable_model import TimetableModel
+
+# Rounds of the capacity split before falling back to one model for the whole problem
+MAX_SPLIT_ROUNDS = 3
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def worker_pool():
+    """Process pool shared by every decomposed and batch solve, one process per core."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=context)
+        return _pool
+
+
+def section_clusters(data):
+    """Connected components of the section–teacher graph, each in `sections` order.
+
+    Two sections end up in the same cluster when a chain of shared teachers links
+    them; sections in different clusters only compete for rooms.
+    """
+    parent = {sec: sec for sec in data["sections"]}
+
+    def find(sec):
+        while parent[sec] != sec:
+            parent[sec] = parent[parent[sec]]
+            sec = parent[sec]
+        return sec
+
+    first_section_of = {}
+    for sec in data["sections"]:
+        for teacher in data["section_course_teacher"][sec].values():
+            if not teacher:
+                continue
+            other = first_section_of.setdefault(teacher, sec)
+            parent[find(sec)] = find(other)
+
+    clusters = {}
+    for sec in data["sections"]:
+        clusters.setdefault(find(sec), []).append(sec)
+    return list(clusters.values())
+
+
+def full_capacity(timetable_model):
+    """({day: {slot: classrooms}}, {day: {first slot of pair: labrooms}}) for the whole week."""
+    classrooms = {
+        d: {slot: timetable_model.classroom_capacity.get(d, {}).get(slot, timetable_model.num_of_classrooms)
+            for slot in timetable_model.time_slots}
+        for d in timetable_model.days
+    }
+    labrooms = {
+        d: {pair[0]: timetable_model.labroom_capacity.get(d, {}).get(pair[0], timetable_model.num_of_labrooms)
+            for pair in timetable_model.lab_pairs}
+        for d in timetable_model.days
+    }
+    return classrooms, labrooms
+
+
+def room_usage(timetable_model, timetable):
+    """Rooms a (partial) timetable occupies, in the same shape as `full_capacity`."""
+    classrooms, labrooms = {}, {}
+    for days in timetable.values():
+        for d, slots in days.items():
+            for slot, cell in slots.items():
+                course = cell["course"]
+                if course == "None":
+                    continue
+                if course in timetable_model.lab_names:
+                    if timetable_model.pair_of_slot[slot][0] == slot:
+                        labrooms.setdefault(d, {})
+                        labrooms[d][slot] = labrooms[d].get(slot, 0) + 1
+                else:
+                    classrooms.setdefault(d, {})
+                    classrooms[d][slot] = classrooms[d].get(slot, 0) + 1
+    return classrooms, labrooms
+
+
+def fits(usage, capacity):
+    return all(n <= capacity[d][slot] for d, slots in usage.items() for slot, n in slots.items())
+
+
+def take(capacity, usage):
+    for d, slots in usage.items():
+        for slot, n in slots.items():
+            capacity[d][slot] -= n
+
+
+def split_capacity(capacity, demands, limits):
+    """Share every cell's rooms between clusters in proportion to `demands`.
+
+    Unused fractions of a room are carried over to the next cell, so over the
+    week each cluster gets close to its share even when a cell has fewer rooms
+    than clusters. A cluster never gets more rooms in a cell than `limits` allows.
+    """
+    total = sum(demands) or 1
+    credit = [0.0] * len(demands)
+    shares = [{} for _ in demands]
+    for d, slots in capacity.items():
+        for slot, rooms in slots.items():
+            given = [0] * len(demands)
+            for i, demand in enumerate(demands):
+                credit[i] += rooms * demand / total
+            for _ in range(rooms):
+                candidates = [i for i in range(len(demands)) if given[i] < limits[i]]
+                if not candidates:
+                    break
+                i = max(candidates, key=lambda i: credit[i])
+                given[i] += 1
+                credit[i] -= 1
+            for i in range(len(demands)):
+                shares[i].setdefault(d, {})[slot] = given[i]
+    return shares
+
+
+def cluster_problem(data, sections, classrooms, labrooms, options, num_workers):
+    problem = {key: value for key, value in data.items() if key not in ("sections", "section_course_teacher", "solver", "diagnostics", "compact")}
+    problem["sections"] = sections
+    problem["section_course_teacher"] = {sec: data["section_course_teacher"][sec] for sec in sections}
+    problem["classroom_capacity"] = classrooms
+    problem["labroom_capacity"] = labrooms
+    problem["solver"] = dict(options, num_workers=num_workers, decompose=False)
+    return problem
+
+
+def solve_cluster(problem):
+    # Imported here: generate_timetable imports this module
+    from generate_timetable import solve_timetable
+    return solve_timetable(problem)
+
+
+def solve_decomposed(data, options):
+    """Solve the independent section clusters of `data` in parallel.
+
+    Returns (response, decomposition report). The response is None when there is
+    nothing to decompose (report None too) or when the clusters could not be fitted
+    into the shared rooms; the caller then solves the whole problem as one model,
+    warm-started from `report["partial_timetable"]`.
+
+    Every cluster is first solved with all rooms to itself. That relaxation gives a
+    valid lower bound, and whenever the timetables it produces fit the rooms together
+    they are the answer. Otherwise the master step keeps the largest clusters that
+    fit, and re-solves the rest on the rooms that are left, split in proportion to
+    their demand. The rounds share the time limit; no round starts once it is spent.
+    """
+    clusters = section_clusters(data)
+    if len(clusters) < 2:
+        return None, None
+
+    start = time.perf_counter()
+    timetable_model = TimetableModel(data)
+    classrooms, labrooms = full_capacity(timetable_model)
+    cores = int(options["num_workers"]) or os.cpu_count() or 1
+    pool = worker_pool()
+
+    def theory_demand(i):
+        return sum(timetable_model.course_req[c] for sec in clusters[i] for c in timetable_model.theory_courses[sec])
+
+    def lab_demand(i):
+        return sum(timetable_model.lab_course_sessions_needed[c] for sec in clusters[i] for c in timetable_model.lab_courses[sec])
+
+    pending = sorted(range(len(clusters)), key=lambda i: -len(clusters[i]))
+    accepted = {}
+    best_bound = 0.0
+    rounds = []
+    limit = options["max_time_in_seconds"]
+    for round_no in range(MAX_SPLIT_ROUNDS):
+        remaining = None if limit is None else float(limit) - (time.perf_counter() - start)
+        if remaining is not None and remaining <= 0:
+            break
+        if round_no == 0:
+            shares = [(classrooms, labrooms)] * len(pending)
+        else:
+            limits = [len(clusters[i]) for i in pending]
+            shares = list(zip(
+                split_capacity(classrooms, [theory_demand(i) for i in pending], limits),
+                split_capacity(labrooms, [lab_demand(i) for i in pending], limits),
+            ))
+        num_workers = max(1, cores // len(pending))
+        # After round 0 a cluster can be infeasible only because of its share of the
+        # rooms; it is rejected anyway, so explaining that would waste the budget
+        round_options = dict(options, max_time_in_seconds=remaining)
+        if round_no > 0:
+            round_options["explain_infeasibility"] = False
+        futures = [
+            pool.submit(solve_cluster, cluster_problem(data, clusters[i], class_share, lab_share, round_options, num_workers))
+            for i, (class_share, lab_share) in zip(pending, shares)
+        ]
+        results = dict(zip(pending, (future.result() for future in futures)))
+
+        if round_no == 0:
+            for i, result in results.items():
+                if result["status"] != "success" and result["solver"]["status"] == "INFEASIBLE":
+                    # Infeasible with every room to itself: no capacity split can help
+                    report = {"clusters": clusters, "rounds": [], "infeasible_cluster": clusters[i]}
+                    return dict(result, solver=dict(result["solver"], wall_time=time.perf_counter() - start)), report
+                if result["status"] == "success":
+                    best_bound += result["solver"]["best_bound"]
+
+        # Master step: keep the timetables that still fit, largest clusters first
+        rejected = []
+        for i in pending:
+            result = results[i]
+            if result["status"] == "success":
+                class_usage, lab_usage = room_usage(timetable_model, result["timetable"])
+                if fits(class_usage, classrooms) and fits(lab_usage, labrooms):
+                    take(classrooms, class_usage)
+                    take(labrooms, lab_usage)
+                    accepted[i] = result
+                    continue
+            rejected.append(i)
+        rounds.append({
+            "clusters": len(pending),
+            "accepted": len(pending) - len(rejected),
+            "wall_time": max(results[i]["solver"]["wall_time"] for i in pending),
+        })
+        pending = rejected
+        if not pending:
+            break
+
+    timetable = {}
+    for sec in data["sections"]:
+        for result in accepted.values():
+            if sec in result["timetable"]:
+                timetable[sec] = result["timetable"][sec]
+    report = {"clusters": clusters, "rounds": rounds}
+    if pending:
+        report["partial_timetable"] = timetable
+        return None, report
+
+    objective = sum(result["solver"]["objective"] for result in accepted.values())
+    solver_report = {
+        "status": "OPTIMAL" if objective <= best_bound else "FEASIBLE",
+        "wall_time": time.perf_counter() - start,
+        "random_seed": options["random_seed"],
+        "objective": objective,
+        "best_bound": best_bound,
+    }
+    return {"status": "success", "timetable": timetable, "solver": solver_report}, report
@@ -0,0 +1,178 @@
+from ortools.sat.python import cp_model
+
+from timetable_model import TimetableModel
+
+
+# ----------------------------
+# Arithmetic pre-checks
+# ----------------------------
+def check_feasibility(data):
+    """Necessary conditions that can be counted without building a model.
+
+    Returns one {"check", "message", ...} entry per violated condition; an empty
+    list does not mean the problem is feasible, only that nothing obvious is wrong.
+    """
+    timetable_model = TimetableModel(data)
+    problems = []
+    problems += _check_sections(timetable_model)
+    problems += _check_teachers(timetable_model)
+    problems += _check_rooms(timetable_model)
+    return problems
+
+
+def usable_slots(timetable_model, d, teacher=None):
+    """Slots of day `d` that are not blocked (and, with `teacher`, in which the teacher is available)."""
+    slots = [slot for slot in timetable_model.time_slots if (d, slot) not in timetable_model.blocked_cells]
+    if teacher is not None:
+        for entry in timetable_model.teacher_unavailable:
+            if entry["teacher"] == teacher and entry.get("day") in (None, d):
+                slots = [slot for slot in slots if entry.get("slot") not in (None, slot)]
+    return slots
+
+
+def lab_pairs_on(timetable_model, slots):
+    return [pair for pair in timetable_model.lab_pairs if pair[0] in slots and pair[1] in slots]
+
+
+def _check_sections(timetable_model):
+    problems = []
+    capacity = sum(len(usable_slots(timetable_model, d)) for d in timetable_model.days)
+    lab_days = sum(1 for d in timetable_model.days if lab_pairs_on(timetable_model, usable_slots(timetable_model, d)))
+    for sec in timetable_model.sections:
+        required = sum(timetable_model.course_req[c] for c in timetable_model.theory_courses[sec])
+        required += sum(2 * timetable_model.lab_course_sessions_needed[c] for c in timetable_model.lab_courses[sec])
+        if required > capacity:
+            problems.append({
+                "check": "section_slots", "section": sec, "required": required, "available": capacity,
+                "message": f"{sec} needs {required} slots but only {capacity} are usable in a week.",
+            })
+        for course in timetable_model.lab_courses[sec]:
+            sessions = timetable_model.lab_course_sessions_needed[course]
+            if sessions > lab_days:
+                problems.append({
+                    "check": "lab_days", "section": sec, "course": course, "required": sessions, "available": lab_days,
+                    "message": f"{course} for {sec} needs {sessions} lab sessions but a lab runs at most once a day on {lab_days} days.",
+                })
+    return problems
+
+
+def _check_teachers(timetable_model):
+    # A lab session takes the teacher's whole day (lab-day exclusivity), and a teacher
+    # gives each section at most one theory class a day.
+    problems = []
+    for teacher in timetable_model.all_teachers:
+        labs = 0
+        theory = {}
+        for sec in timetable_model.sections:
+            for course in timetable_model.teacher_courses[sec].get(teacher, []):
+                if course in timetable_model.lab_names:
+                    labs += timetable_model.lab_course_sessions_needed[course]
+                else:
+                    theory[sec] = theory.get(sec, 0) + timetable_model.course_req[course]
+
+        available = {d: usable_slots(timetable_model, d, teacher) for d in timetable_model.days}
+        teaching_days = [d for d in timetable_model.days if available[d]]
+        lab_capable = sorted(len(available[d]) for d in teaching_days if lab_pairs_on(timetable_model, available[d]))
+        if labs > len(lab_capable):
+            problems.append({
+                "check": "teacher_lab_days", "teacher": teacher, "required": labs, "available": len(lab_capable),
+                "message": f"{teacher} runs {labs} lab sessions, each needing a day of its own, but has only {len(lab_capable)} days with a free lab pair.",
+            })
+            continue
+
+        # Best case: the labs go on the lab days with the fewest free slots
+        theory_slots = sum(len(available[d]) for d in teaching_days) - sum(lab_capable[:labs])
+        total_theory = sum(theory.values())
+        if total_theory > theory_slots:
+            problems.append({
+                "check": "teacher_load", "teacher": teacher, "required": total_theory, "available": theory_slots,
+                "message": f"{teacher} teaches {total_theory} theory classes but has at most {theory_slots} free slots outside lab days.",
+            })
+        theory_days = len(teaching_days) - labs
+        for sec, sessions in theory.items():
+            if sessions > theory_days:
+                problems.append({
+                    "check": "teacher_daily_cap", "teacher": teacher, "section": sec, "required": sessions, "available": theory_days,
+                    "message": f"{teacher} teaches {sec} {sessions} theory classes but can see it at most once a day on {theory_days} days without a lab.",
+                })
+    return problems
+
+
+def _check_rooms(timetable_model):
+    problems = []
+    lab_sessions = sum(
+        timetable_model.lab_course_sessions_needed[c] for sec in timetable_model.sections for c in timetable_model.lab_courses[sec]
+    )
+    lab_blocks = sum(
+        timetable_model.labroom_capacity.get(d, {}).get(pair[0], timetable_model.num_of_labrooms)
+        for d in timetable_model.days
+        for pair in lab_pairs_on(timetable_model, usable_slots(timetable_model, d))
+    )
+    if lab_sessions > lab_blocks:
+        problems.append({
+            "check": "labrooms", "required": lab_sessions, "available": lab_blocks,
+            "message": f"{lab_sessions} lab sessions are needed but the lab rooms offer only {lab_blocks} lab blocks a week.",
+        })
+
+    # No more classrooms are useful in a slot than there are sections with theory
+    with_theory = sum(1 for sec in timetable_model.sections if timetable_model.theory_courses[sec])
+    theory_sessions = sum(
+        timetable_model.course_req[c] for sec in timetable_model.sections for c in timetable_model.theory_courses[sec]
+    )
+    classroom_slots = sum(
+        min(timetable_model.classroom_capacity.get(d, {}).get(slot, timetable_model.num_of_classrooms), with_theory)
+        for d in timetable_model.days
+        for slot in usable_slots(timetable_model, d)
+    )
+    if theory_sessions > classroom_slots:
+        problems.append({
+            "check": "classrooms", "required": theory_sessions, "available": classroom_slots,
+            "message": f"{theory_sessions} theory classes are needed but the classrooms offer only {classroom_slots} room-slots a week.",
+        })
+    return problems
+
+
+# ----------------------------
+# Infeasibility explanation
+# ----------------------------
+def explain_infeasibility(data, max_time_in_seconds=None, random_seed=0):
+    """Name a small set of constraint groups that cannot hold together.
+
+    Builds the model with one assumption literal per constraint group and asks
+    CP-SAT for the assumptions behind the infeasibility, then drops groups one by
+    one while the rest stay infeasible. `minimal` is False when the time ran out
+    before every group was tried.
+    """
+    timetable_model = TimetableModel(data, explain=True).build()
+    solver = cp_model.CpSolver()
+    if max_time_in_seconds is not None:
+        solver.parameters.max_time_in_seconds = float(max_time_in_seconds)
+    solver.parameters.num_workers = 1  # core extraction is deterministic on a single worker
+    solver.parameters.random_seed = int(random_seed)
+    status = solver.Solve(timetable_model.model)
+    if status != cp_model.INFEASIBLE:
+        return {"status": solver.StatusName(status), "conflicting_constraints": [], "minimal": False}
+
+    name_of = {lit.Index(): group for group, lit in timetable_model.groups.items()}
+    core = [name_of[index] for index in solver.SufficientAssumptionsForInfeasibility()]
+    remaining = None if max_time_in_seconds is None else float(max_time_in_seconds) - solver.WallTime()
+    minimal = True
+    for group in list(core):
+        if group not in core:
+            continue  # already dropped along with an earlier one
+        if remaining is not None and remaining <= 0:
+            minimal = False
+            break
+        trial = [g for g in core if g != group]
+        timetable_model.model.ClearAssumptions()
+        timetable_model.model.AddAssumptions([timetable_model.groups[g] for g in trial])
+        if remaining is not None:
+            solver.parameters.max_time_in_seconds = remaining
+        status = solver.Solve(timetable_model.model)
+        if remaining is not None:
+            remaining -= solver.WallTime()
+        if status == cp_model.INFEASIBLE:
+            core = [name_of[index] for index in solver.SufficientAssumptionsForInfeasibility()] or trial
+        elif status != cp_model.FEASIBLE and status != cp_model.OPTIMAL:
+            minimal = False
+    return {"status": "INFEASIBLE", "conflicting_constraints": core, "minimal": minimal}
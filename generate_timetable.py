@@ -1,382 +1,313 @@
 from ortools.sat.python import cp_model
 import random
+import threading
+import time
 from tabulate import tabulate
-
-def solve_timetable(data):
-    # Extract data from input
-    sections = data["sections"]
-    section_course_teacher = data["section_course_teacher"]
-    course_req = data["course_req"]
-    num_of_classrooms = data["num_of_classrooms"]
-    num_of_labrooms = data["num_of_labrooms"]
-    all_lab_course_names = data["all_lab_course_names"]
-    lab_course_sessions_needed = data["lab_course_sessions_needed"]
-    
-    # Days and time slots
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
-    time_slots = ["8:30-9:30", "9:30-10:30", "11:00-12:00", "12:00-1:00", "2:00-3:00", "3:00-4:00"]
-    lab_pairs = [("8:30-9:30", "9:30-10:30"), ("11:00-12:00", "12:00-1:00"), ("2:00-3:00", "3:00-4:00")]
-
-    # ----------------------------
-    # Preprocessing
-    # ----------------------------
-    sec_teachers = {}
-    for sec in sections:
-        teachers = list(section_course_teacher[sec].values())
-        sec_teachers[sec] = list(set(teachers + [None]))  # Unique teachers + None
-
-    sec_t2i = {sec: {teacher: idx for idx, teacher in enumerate(sec_teachers[sec])} for sec in sections}
-    sec_i2t = {sec: {idx: teacher for teacher, idx in sec_t2i[sec].items()} for sec in sections}
-
-    # Identify lab courses taken by each section
-    section_taken_lab_courses = {sec: [] for sec in sections}
-    for sec in sections:
-        for course_name in section_course_teacher[sec].keys():
-            if course_name in all_lab_course_names:
-                section_taken_lab_courses[sec].append(course_name)
-
-    # Store theory session activation vars for later use in teacher conflict constraint
-    theory_session_active_vars = {}  # (sec, course_name, day, slot) -> BoolVar
+from timetable_model import STRENGTHENINGS, TimetableModel
+from decompose import solve_decomposed
+from staged import solve_staged
+from feasibility import check_feasibility, explain_infeasibility
+from instrumentation import PhaseTimer, PresolveClock, model_stats, solver_stats
+from response_format import compact_response
+
+# Server-side defaults for the CP-SAT search. Every key can be overridden per
+# request through the optional "solver" object of the payload.
+DEFAULT_SOLVER_OPTIONS = {
+    "max_time_in_seconds": 120.0,
+    "max_deterministic_time": None,  # budget in CP-SAT's deterministic time units; None means no such limit
+    "num_workers": 0,  # 0 lets CP-SAT use every core
+    "random_seed": None,  # None draws a fresh seed; the seed used is reported back
+    "relative_gap_limit": None,  # None keeps the CP-SAT default
+    "absolute_gap_limit": None,
+    "stop_after_first_solution": False,
+    "decompose": True,  # solve sections that share no teachers as separate models
+    "explain_infeasibility": True,  # name the conflicting constraint groups when no timetable exists
+    "alternatives": 1,  # number of distinct timetables to return
+    "diversity": 0.1,  # share of the sessions each alternative moves away from every earlier one
+    "staged": False,  # place the labs first, then the theory classes around them
+    "strengthen": [],  # names from timetable_model.STRENGTHENINGS to add to the model
+}
+
+
+def solver_options(data):
+    options = dict(DEFAULT_SOLVER_OPTIONS)
+    overrides = data.get("solver") or {}
+    unknown = set(overrides) - set(DEFAULT_SOLVER_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown solver options: {', '.join(sorted(unknown))}")
+    options.update(overrides)
+    unknown = set(options["strengthen"]) - set(STRENGTHENINGS)
+    if unknown:
+        raise ValueError(f"Unknown strengthenings: {', '.join(sorted(unknown))}")
+    if not isinstance(options["alternatives"], int) or options["alternatives"] < 1:
+        raise ValueError("alternatives must be a positive integer")
+    if not 0 <= options["diversity"] <= 1:
+        raise ValueError("diversity must be between 0 and 1")
+    if options["random_seed"] is None:
+        options["random_seed"] = random.randint(1, 10000000)
+    return options
+
+
+def remaining_time(options, spent):
+    """`options` with `spent` seconds taken off the time limit, for a solve that follows an earlier attempt."""
+    if options["max_time_in_seconds"] is None:
+        return options
+    return dict(options, max_time_in_seconds=max(float(options["max_time_in_seconds"]) - spent, 0.0))
+
+
+def configure_solver(solver, options):
+    params = solver.parameters
+    if options["max_time_in_seconds"] is not None:
+        params.max_time_in_seconds = float(options["max_time_in_seconds"])
+    if options["max_deterministic_time"] is not None:
+        params.max_deterministic_time = float(options["max_deterministic_time"])
+    params.num_workers = int(options["num_workers"])
+    params.random_seed = int(options["random_seed"])
+    if options["relative_gap_limit"] is not None:
+        params.relative_gap_limit = float(options["relative_gap_limit"])
+    if options["absolute_gap_limit"] is not None:
+        params.absolute_gap_limit = float(options["absolute_gap_limit"])
+    params.stop_after_first_solution = bool(options["stop_after_first_solution"])
+
+
+def solver_report(solver, status, options):
+    report = {
+        "status": solver.StatusName(status),
+        "wall_time": solver.WallTime(),
+        "random_seed": options["random_seed"],
+    }
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        report["objective"] = solver.ObjectiveValue()
+        report["best_bound"] = solver.BestObjectiveBound()
+        # CP-SAT also says OPTIMAL when it stops on a gap limit; only a closed gap proves it
+        if report["objective"] > report["best_bound"]:
+            report["status"] = "FEASIBLE"
+    return report
+
+
+class TimetableSolutionCallback(cp_model.CpSolverSolutionCallback):
+    """Hands every improving solution, already in the response format, to `on_solution`."""
+
+    def __init__(self, timetable_model, on_solution):
+        super().__init__()
+        self.timetable_model = timetable_model
+        self.on_solution = on_solution
+
+    def on_solution_callback(self):
+        self.on_solution({
+            "objective": self.ObjectiveValue(),
+            "best_bound": self.BestObjectiveBound(),
+            "wall_time": self.WallTime(),
+            "timetable": self.timetable_model.extract(self),
+        })
+
+
+def stop_when_set(solver, stop_event, finished):
+    # Polls because stop_event may be a multiprocessing proxy, which cannot be waited on together with `finished`
+    while not finished.is_set():
+        if stop_event.wait(0.1):
+            solver.StopSearch()
+            return
+
+
+def run_solver(solver, model, callback=None, stop_event=None):
+    """solver.Solve(model, callback), stopped early once `stop_event` is set."""
+    finished = threading.Event()
+    if stop_event is not None:
+        threading.Thread(target=stop_when_set, args=(solver, stop_event, finished), daemon=True).start()
+    try:
+        return solver.Solve(model, callback)
+    finally:
+        finished.set()
+
+
+def alternative_timetables(timetable_model, solver, options, stop_event=None):
+    """Up to options["alternatives"] - 1 more timetables after the one `solver` holds.
+
+    Each one moves at least a `diversity` share of the sessions (one at least)
+    away from every earlier timetable. The constraints are added to the built
+    model, which is solved again rather than rebuilt, starting from the previous
+    timetable as a hint. The list is shorter when no further timetable exists or
+    the search runs out of time.
+    """
+    alternatives = []
+    min_changes = max(1, round(options["diversity"] * timetable_model.num_sessions()))
+    for _ in range(options["alternatives"] - 1):
+        timetable_model.exclude(solver, min_changes)
+        timetable_model.hint_solution(solver)
+        solver = cp_model.CpSolver()
+        configure_solver(solver, options)
+        status = run_solver(solver, timetable_model.model, stop_event=stop_event)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            break
+        alternatives.append({"timetable": timetable_model.extract(solver), "solver": solver_report(solver, status, options)})
+    return alternatives
+
+
+def solve_timetable(data, on_solution=None, stop_event=None, cache=None, metrics=None):
+    """Solve `data` and return the response dict.
+
+    `on_solution` is called with each improving solution while the search runs.
+    Setting `stop_event` stops the search early; the best timetable found so far
+    is still returned. With a `ResultCache`, optimal results for the same problem
+    are returned without solving and near matches warm-start the search.
+
+    Unless the "decompose" option is off, clusters of sections that share no
+    teachers are solved in parallel (see `decompose.solve_decomposed`). Streaming
+    and cancellation need a single search, so they always use one model.
+
+    With "alternatives" above 1, the response also lists further timetables that
+    each differ from the earlier ones (see `alternative_timetables`).
+
+    With the "staged" option, labs are placed before the theory classes (see
+    `staged.solve_staged`), falling back to the joint model when that fails.
+
+    Problems that fail the arithmetic checks of `feasibility.check_feasibility`
+    are rejected before any model is built.
+
+    Phase timings, model sizes and CP-SAT statistics are folded into `metrics`
+    (a `metrics.Metrics`), and returned under "diagnostics" when the payload
+    sets `"diagnostics": true`.
+
+    With `"compact": true` in the payload, the timetables are returned in the
+    compact form of `response_format.compact_timetable`.
+    """
+    timer = PhaseTimer()
+    diagnostics = {"detailed": bool(data.get("diagnostics"))}
+    start = time.perf_counter()
+    response = _solve(data, on_solution, stop_event, cache, timer, diagnostics)
+    if data.get("compact"):
+        with timer.phase("compact"):
+            compact_response(TimetableModel(data).problem, response)
+    detailed = diagnostics.pop("detailed")
+    diagnostics["phases"] = timer.phases
+    diagnostics["total_time"] = time.perf_counter() - start
+    if metrics is not None:
+        metrics.observe_solve(diagnostics)
+    if detailed:
+        response["diagnostics"] = diagnostics
+    return response
+
+
+def _solve(data, on_solution, stop_event, cache, timer, diagnostics):
+    options = solver_options(data)
+
+    with timer.phase("feasibility_check"):
+        problems = check_feasibility(data)
+    if problems:
+        diagnostics["status"] = "PRECHECK"
+        report = {"status": "INFEASIBLE", "wall_time": 0.0, "random_seed": options["random_seed"]}
+        return {"status": "failed", "message": problems[0]["message"], "solver": report, "infeasibility": {"checks": problems}}
+
+    # Alternatives are found by re-solving one model, so they bypass the cache,
+    # the decomposition and the staged mode
+    single = options["alternatives"] == 1
+    if not single:
+        cache = None
+
+    warm_start = None
+    if cache is not None:
+        with timer.phase("cache_lookup"):
+            cache_key, cached, warm_start = cache.lookup(data)
+        if cached is not None:
+            diagnostics["status"] = "CACHED"
+            return dict(cached, cache={"hit": True})
+
+    decomposition = None
+    if options["decompose"] and single and on_solution is None and stop_event is None:
+        with timer.phase("decompose"):
+            response, decomposition = solve_decomposed(data, options)
+        if response is not None:
+            diagnostics["status"] = response["solver"]["status"]
+            if cache is not None:
+                if response["status"] == "success":
+                    cache.store(cache_key, data, response)
+                response["cache"] = {"hit": False, "warm_start": False}
+            response["decomposition"] = decomposition
+            return response
+        if decomposition is not None:
+            if not warm_start:
+                # The clusters did not fit the rooms together; start from the ones that did
+                warm_start = {"timetable": decomposition.pop("partial_timetable")}
+            options = remaining_time(options, timer.phases["decompose"])
+
+    staging = None
+    if options["staged"] and single:
+        with timer.phase("staged"):
+            response, staging = solve_staged(data, options, on_solution, stop_event)
+        if response is not None:
+            diagnostics["status"] = response["solver"]["status"]
+            if cache is not None:
+                cache.store(cache_key, data, response)
+                response["cache"] = {"hit": False, "warm_start": False}
+            response["staged"] = staging
+            if decomposition is not None:
+                decomposition.pop("partial_timetable", None)
+                response["decomposition"] = dict(decomposition, fallback=True)
+            return response
+        if staging is not None:
+            options = remaining_time(options, timer.phases["staged"])
 
     # ----------------------------
     # Model Setup
     # ----------------------------
-    model = cp_model.CpModel()
-    assign = {}  # (sec, day, slot) -> teacher_idx
-    for sec in sections:
-        domain = list(sec_t2i[sec].values())
-        for d in days:
-            for slot in time_slots:
-                assign[(sec, d, slot)] = model.NewIntVar(
-                    min(domain), max(domain), f"assign_{sec}_{d}_{slot.replace(':','').replace('-','')}"
-                )
-
-    # ----------------------------
-    # Non-lab Course Constraints
-    # ----------------------------
-    for sec in sections:
-        for course_name, req_sessions in course_req.items():
-            teacher = section_course_teacher[sec].get(course_name)
-            if not teacher:  # This section does not take this theory course
-                continue
-            teacher_idx = sec_t2i[sec][teacher]
-            occurrence_vars_for_course = []
-            for d in days:
-                for slot in time_slots:
-                    slot_clean = slot.replace(':', '').replace('-', '')
-                    # b is true if this theory course is taught by its teacher in this slot
-                    b = model.NewBoolVar(f"occ_theory_{sec}_{course_name.replace(' ','')}_{d}_{slot_clean}")
-                    model.Add(assign[(sec, d, slot)] == teacher_idx).OnlyEnforceIf(b)
-                    model.Add(assign[(sec, d, slot)] != teacher_idx).OnlyEnforceIf(b.Not())
-                    occurrence_vars_for_course.append(b)
-                    theory_session_active_vars[(sec, course_name, d, slot)] = b  # Store for later
-            model.Add(sum(occurrence_vars_for_course) == req_sessions)
-
-    # ----------------------------
-    # Lab Course Constraints
-    # ----------------------------
-    lab_activation_vars = {}  # (sec, lab_c_name, day, s1, s2) -> BoolVar
-
-    for sec in sections:
-        for lab_c_name in section_taken_lab_courses[sec]:
-            lab_teacher_name = section_course_teacher[sec][lab_c_name]
-            lab_teacher_idx = sec_t2i[sec][lab_teacher_name]
-            num_sessions_needed = lab_course_sessions_needed[lab_c_name]
-
-            section_specific_lab_course_blocks = []
-            for d in days:
-                for s1, s2 in lab_pairs:
-                    s1_clean = s1.replace(':', '').replace('-', '')
-                    s2_clean = s2.replace(':', '').replace('-', '')
-                    lab_c_clean = lab_c_name.replace(' ', '')
-
-                    # b_lab_active is true if this specific lab course is scheduled for this section in this block
-                    b_lab_active = model.NewBoolVar(f"lab_active_{sec}_{lab_c_clean}_{d}_{s1_clean}_{s2_clean}")
-                    lab_activation_vars[(sec, lab_c_name, d, s1, s2)] = b_lab_active
-
-                    # If b_lab_active, assign lab teacher to both slots
-                    model.Add(assign[(sec, d, s1)] == lab_teacher_idx).OnlyEnforceIf(b_lab_active)
-                    model.Add(assign[(sec, d, s2)] == lab_teacher_idx).OnlyEnforceIf(b_lab_active)
-
-                    # If not b_lab_active, at least one slot is not the lab teacher (reification for Not)
-                    ne1 = model.NewBoolVar(f"ne1_{sec}_{lab_c_clean}_{d}_{s1_clean}_{s2_clean}")
-                    model.Add(assign[(sec, d, s1)] != lab_teacher_idx).OnlyEnforceIf(ne1)
-                    model.Add(assign[(sec, d, s1)] == lab_teacher_idx).OnlyEnforceIf(ne1.Not())
-
-                    ne2 = model.NewBoolVar(f"ne2_{sec}_{lab_c_clean}_{d}_{s1_clean}_{s2_clean}")
-                    model.Add(assign[(sec, d, s2)] != lab_teacher_idx).OnlyEnforceIf(ne2)
-                    model.Add(assign[(sec, d, s2)] == lab_teacher_idx).OnlyEnforceIf(ne2.Not())
-                    model.AddBoolOr([ne1, ne2]).OnlyEnforceIf(b_lab_active.Not())
-
-                    section_specific_lab_course_blocks.append(b_lab_active)
-
-            # Ensure this specific lab course meets its weekly session requirement for this section
-            model.Add(sum(section_specific_lab_course_blocks) == num_sessions_needed)
-
-    # Lab Exclusivity (within section)
-    for sec in sections:
-        for lab_c_name in section_taken_lab_courses[sec]:
-            lab_teacher_name = section_course_teacher[sec][lab_c_name]
-            lab_teacher_idx = sec_t2i[sec][lab_teacher_name]
-            lab_c_clean = lab_c_name.replace(' ', '')
-            for d in days:
-                for s1_lab, s2_lab in lab_pairs:
-                    b_this_lab_active = lab_activation_vars[(sec, lab_c_name, d, s1_lab, s2_lab)]
-                    for slot_other in time_slots:
-                        if slot_other not in (s1_lab, s2_lab):
-                            model.Add(assign[(sec, d, slot_other)] != lab_teacher_idx).OnlyEnforceIf(b_this_lab_active)
-
-    # Lab-room Capacity
-    for d in days:
-        for s1, s2 in lab_pairs:
-            simultaneous_labs_in_slot_pair = []
-            for sec_check in sections:
-                for lab_c_name_check in section_taken_lab_courses[sec_check]:
-                    simultaneous_labs_in_slot_pair.append(lab_activation_vars[(sec_check, lab_c_name_check, d, s1, s2)])
-            if simultaneous_labs_in_slot_pair:
-                model.Add(sum(simultaneous_labs_in_slot_pair) <= num_of_labrooms)
-
-    # Cross-section lab-day exclusivity for teachers
-    for lab_sec in sections:
-        for lab_c_name in section_taken_lab_courses[lab_sec]:
-            lab_teacher_name = section_course_teacher[lab_sec][lab_c_name]
-            if not lab_teacher_name:
-                continue
-
-            for lab_day in days:
-                for s1_lab, s2_lab in lab_pairs:
-                    b_is_this_lab_active = lab_activation_vars[(lab_sec, lab_c_name, lab_day, s1_lab, s2_lab)]
-                    for other_sec in sections:
-                        if other_sec == lab_sec:
-                            continue
-                        if lab_teacher_name in sec_t2i[other_sec]:
-                            teacher_idx_in_other_sec = sec_t2i[other_sec][lab_teacher_name]
-                            for slot_in_other_sec in time_slots:
-                                model.Add(assign[(other_sec, lab_day, slot_in_other_sec)] != teacher_idx_in_other_sec).OnlyEnforceIf(b_is_this_lab_active)
-
-    # ----------------------------
-    # Total Non-Empty Slots per Section
-    # ----------------------------
-    for sec in sections:
-        none_idx_for_sec = sec_t2i[sec][None]
-        total_theory_slots = sum(course_req.get(c, 0) for c in section_course_teacher[sec].keys() if c in course_req)
-        total_lab_slots_for_section = 0
-        for lab_c_name in section_taken_lab_courses[sec]:
-            total_lab_slots_for_section += lab_course_sessions_needed[lab_c_name] * 2
-        current_total_required_slots = total_theory_slots + total_lab_slots_for_section
-
-        actually_used_slots_in_sec = []
-        for d in days:
-            for slot in time_slots:
-                slot_clean = slot.replace(':', '').replace('-', '')
-                b_slot_used = model.NewBoolVar(f"used_{sec}_{d}_{slot_clean}")
-                model.Add(assign[(sec, d, slot)] != none_idx_for_sec).OnlyEnforceIf(b_slot_used)
-                model.Add(assign[(sec, d, slot)] == none_idx_for_sec).OnlyEnforceIf(b_slot_used.Not())
-                actually_used_slots_in_sec.append(b_slot_used)
-        model.Add(sum(actually_used_slots_in_sec) == current_total_required_slots)
-
-    # ----------------------------
-    # Teacher Conflict Constraints
-    # ----------------------------
-    all_teachers_globally = set()
-    for sec_name_iter in sections:
-        for t_name in section_course_teacher[sec_name_iter].values():
-            all_teachers_globally.add(t_name)
-
-    for teacher_name in all_teachers_globally:
-        if teacher_name is None:
-            continue
-        clean_teacher_name_conflict = teacher_name.replace(' ', '_').replace('.', '')
-        for d in days:
-            # Constraint 1: No teacher double-booking in same slot across sections
-            for slot in time_slots:
-                slot_clean = slot.replace(':', '').replace('-', '')
-                teacher_assignments_in_slot = []
-                for sec in sections:
-                    if teacher_name in sec_t2i[sec]:
-                        teacher_idx_for_sec = sec_t2i[sec][teacher_name]
-                        b_teacher_in_sec_slot = model.NewBoolVar(f"tb_{clean_teacher_name_conflict}_{sec}_{d}_{slot_clean}")
-                        model.Add(assign[(sec, d, slot)] == teacher_idx_for_sec).OnlyEnforceIf(b_teacher_in_sec_slot)
-                        model.Add(assign[(sec, d, slot)] != teacher_idx_for_sec).OnlyEnforceIf(b_teacher_in_sec_slot.Not())
-                        teacher_assignments_in_slot.append(b_teacher_in_sec_slot)
-                if teacher_assignments_in_slot:
-                    model.Add(sum(teacher_assignments_in_slot) <= 1)
-
-            # Constraint 2: A teacher teaches at most one non-lab class per day per section
-            for sec in sections:
-                is_teacher_conducting_lab_this_sec_day = model.NewBoolVar(f"teacher_lab_{clean_teacher_name_conflict}_{sec}_{d}")
-                active_labs_by_teacher_for_sec_day = []
-                for lab_c_name in section_taken_lab_courses[sec]:
-                    if section_course_teacher[sec].get(lab_c_name) == teacher_name:
-                        for s1_lab, s2_lab in lab_pairs:
-                            active_labs_by_teacher_for_sec_day.append(lab_activation_vars[(sec, lab_c_name, d, s1_lab, s2_lab)])
-                if active_labs_by_teacher_for_sec_day:
-                    model.Add(sum(active_labs_by_teacher_for_sec_day) > 0).OnlyEnforceIf(is_teacher_conducting_lab_this_sec_day)
-                    model.Add(sum(active_labs_by_teacher_for_sec_day) == 0).OnlyEnforceIf(is_teacher_conducting_lab_this_sec_day.Not())
-                else:
-                    model.Add(is_teacher_conducting_lab_this_sec_day == 0)
-
-                daily_theory_sessions_by_teacher_sec = []
-                if teacher_name in sec_t2i[sec]:
-                    for course_name_theory in course_req.keys():
-                        if section_course_teacher[sec].get(course_name_theory) == teacher_name:
-                            for slot in time_slots:
-                                if (sec, course_name_theory, d, slot) in theory_session_active_vars:
-                                    daily_theory_sessions_by_teacher_sec.append(theory_session_active_vars[(sec, course_name_theory, d, slot)])
-                    if daily_theory_sessions_by_teacher_sec:
-                        model.Add(sum(daily_theory_sessions_by_teacher_sec) <= 1).OnlyEnforceIf(is_teacher_conducting_lab_this_sec_day.Not())
-
-    # ----------------------------
-    # Classroom Availability & Saturday Cutoff
-    # ----------------------------
-    for d in days:
-        for slot in time_slots:
-            slot_clean = slot.replace(':', '').replace('-', '')
-            active_general_classes_in_slot = []
-            for sec in sections:
-                none_idx_for_sec = sec_t2i[sec][None]
-                is_assigned_in_slot = model.NewBoolVar(f"assigned_{sec}_{d}_{slot_clean}")
-                model.Add(assign[(sec, d, slot)] != none_idx_for_sec).OnlyEnforceIf(is_assigned_in_slot)
-                model.Add(assign[(sec, d, slot)] == none_idx_for_sec).OnlyEnforceIf(is_assigned_in_slot.Not())
-
-                is_part_of_active_lab_for_sec_slot = model.NewBoolVar(f"is_part_of_any_lab_{sec}_{d}_{slot_clean}")
-                potential_active_labs_for_sec_slot = []
-                for s1_lab, s2_lab in lab_pairs:
-                    if slot == s1_lab or slot == s2_lab:
-                        for lab_c_name in section_taken_lab_courses[sec]:
-                            potential_active_labs_for_sec_slot.append(lab_activation_vars[(sec, lab_c_name, d, s1_lab, s2_lab)])
-                if potential_active_labs_for_sec_slot:
-                    model.Add(sum(potential_active_labs_for_sec_slot) > 0).OnlyEnforceIf(is_part_of_active_lab_for_sec_slot)
-                    model.Add(sum(potential_active_labs_for_sec_slot) == 0).OnlyEnforceIf(is_part_of_active_lab_for_sec_slot.Not())
-                else:
-                    model.Add(is_part_of_active_lab_for_sec_slot == 0)
-
-                uses_general_classroom = model.NewBoolVar(f"uses_gen_room_{sec}_{d}_{slot_clean}")
-                model.AddImplication(uses_general_classroom, is_assigned_in_slot)
-                model.AddImplication(uses_general_classroom, is_part_of_active_lab_for_sec_slot.Not())
-                model.Add(uses_general_classroom == 1).OnlyEnforceIf([is_assigned_in_slot, is_part_of_active_lab_for_sec_slot.Not()])
-                active_general_classes_in_slot.append(uses_general_classroom)
-
-            if active_general_classes_in_slot:
-                model.Add(sum(active_general_classes_in_slot) <= num_of_classrooms)
-
-    for sec in sections:
-        none_idx_for_sec = sec_t2i[sec][None]
-        for slot_to_block in ("2:00-3:00", "3:00-4:00"):
-            if slot_to_block in time_slots:
-                model.Add(assign[(sec, "Saturday", slot_to_block)] == none_idx_for_sec)
-
-    # ----------------------------
-    # Compactness Objective
-    # ----------------------------
-    all_daily_sum_squared_terms = []
-    num_slots_in_day = len(time_slots)
-    possible_daily_idles = range(num_slots_in_day + 1)
-    allowed_value_square_tuples = [(i, i * i) for i in possible_daily_idles]
-
-    for sec in sections:
-        none_idx_for_sec = sec_t2i[sec][None]
-        for d in days:
-            daily_assignment_vars = [assign[(sec, d, slot)] for slot in time_slots]
-            daily_internal_idle_indicators_for_sd = []
-            for j in range(num_slots_in_day):
-                is_slot_j_free = model.NewBoolVar(f"isfree_{sec}_{d}_{j}")
-                model.Add(daily_assignment_vars[j] == none_idx_for_sec).OnlyEnforceIf(is_slot_j_free)
-                model.Add(daily_assignment_vars[j] != none_idx_for_sec).OnlyEnforceIf(is_slot_j_free.Not())
-
-                has_class_before_j = model.NewBoolVar(f"hasclassbefore_{sec}_{d}_{j}")
-                if j == 0:
-                    model.Add(has_class_before_j == 0)
-                else:
-                    occupied_before = [model.NewBoolVar(f"occb_{sec}_{d}_{j}_{k}") for k in range(j)]
-                    for k_idx in range(j):
-                        model.Add(daily_assignment_vars[k_idx] != none_idx_for_sec).OnlyEnforceIf(occupied_before[k_idx])
-                        model.Add(daily_assignment_vars[k_idx] == none_idx_for_sec).OnlyEnforceIf(occupied_before[k_idx].Not())
-                    model.Add(sum(occupied_before) > 0).OnlyEnforceIf(has_class_before_j)
-                    model.Add(sum(occupied_before) == 0).OnlyEnforceIf(has_class_before_j.Not())
-
-                has_class_after_j = model.NewBoolVar(f"hasclassafter_{sec}_{d}_{j}")
-                if j == num_slots_in_day - 1:
-                    model.Add(has_class_after_j == 0)
-                else:
-                    occupied_after = [model.NewBoolVar(f"occa_{sec}_{d}_{j}_{k}") for k in range(j + 1, num_slots_in_day)]
-                    for k_idx, actual_slot_idx in enumerate(range(j + 1, num_slots_in_day)):
-                        model.Add(daily_assignment_vars[actual_slot_idx] != none_idx_for_sec).OnlyEnforceIf(occupied_after[k_idx])
-                        model.Add(daily_assignment_vars[actual_slot_idx] == none_idx_for_sec).OnlyEnforceIf(occupied_after[k_idx].Not())
-                    model.Add(sum(occupied_after) > 0).OnlyEnforceIf(has_class_after_j)
-                    model.Add(sum(occupied_after) == 0).OnlyEnforceIf(has_class_after_j.Not())
-
-                slot_j_is_internal_idle = model.NewBoolVar(f"internalidle_{sec}_{d}_{j}")
-                model.AddImplication(slot_j_is_internal_idle, is_slot_j_free)
-                model.AddImplication(slot_j_is_internal_idle, has_class_before_j)
-                model.AddImplication(slot_j_is_internal_idle, has_class_after_j)
-                model.Add(slot_j_is_internal_idle == 1).OnlyEnforceIf([is_slot_j_free, has_class_before_j, has_class_after_j])
-                daily_internal_idle_indicators_for_sd.append(slot_j_is_internal_idle)
-
-            daily_sum_var = model.NewIntVar(0, num_slots_in_day, f"daily_sum_idle_{sec}_{d}")
-            model.Add(daily_sum_var == sum(daily_internal_idle_indicators_for_sd))
-            daily_sum_sq_var = model.NewIntVar(0, num_slots_in_day * num_slots_in_day, f"daily_sum_sq_idle_{sec}_{d}")
-            model.AddAllowedAssignments([daily_sum_var, daily_sum_sq_var], allowed_value_square_tuples)
-            all_daily_sum_squared_terms.append(daily_sum_sq_var)
-
-    max_total_penalty = len(sections) * len(days) * (num_slots_in_day**2)
-    total_penalty_objective = model.NewIntVar(0, max_total_penalty if max_total_penalty > 0 else 1, "total_penalty_objective")
-    if all_daily_sum_squared_terms:
-        model.Add(total_penalty_objective == sum(all_daily_sum_squared_terms))
-    else:
-        model.Add(total_penalty_objective == 0)
-    model.Minimize(total_penalty_objective)
+    with timer.phase("build"):
+        timetable_model = TimetableModel(data, strengthen=options["strengthen"]).build(timer)
+    # The strengthenings may solve sub-problems (idle_bound); that counts against the time limit
+    options = remaining_time(options, timer.phases.get("build.strengthening", 0.0))
+    with timer.phase("hints"):
+        hints = timetable_model.add_hints(warm_start["timetable"]) if warm_start else []
+    diagnostics["model"] = model_stats(timetable_model, literals=diagnostics["detailed"])
 
     # ----------------------------
     # Solve
     # ----------------------------
     solver = cp_model.CpSolver()
-    solver.parameters.random_seed = random.randint(1, 10000000)
-    status = solver.Solve(model)
-
-    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        return {"status": "failed", "message": "No feasible timetable found."}
-
-    # Prepare the result in the expected format
-    result = {}
-    for sec in sections:
-        result[sec] = {}
-        for d in days:
-            result[sec][d] = {}
-            for slot in time_slots:
-                assigned_teacher_idx = solver.Value(assign[(sec, d, slot)])
-                teacher_name_assigned = sec_i2t[sec][assigned_teacher_idx]
-
-                if teacher_name_assigned is None:
-                    result[sec][d][slot] = {"course": "None", "teacher": ""}
-                else:
-                    course_name_display = "None"
-                    # Check if it's an active lab session
-                    is_active_lab_session_slot = False
-                    for lab_c_name_iter in section_taken_lab_courses[sec]:
-                        if section_course_teacher[sec].get(lab_c_name_iter) == teacher_name_assigned:
-                            for s1_lab_disp, s2_lab_disp in lab_pairs:
-                                if (slot == s1_lab_disp or slot == s2_lab_disp) and solver.Value(lab_activation_vars.get((sec, lab_c_name_iter, d, s1_lab_disp, s2_lab_disp), 0)):
-                                    course_name_display = lab_c_name_iter
-                                    is_active_lab_session_slot = True
-                                    break
-                            if is_active_lab_session_slot:
-                                break
-
-                    if not is_active_lab_session_slot:
-                        for c_name, t_name_map in section_course_teacher[sec].items():
-                            if t_name_map == teacher_name_assigned and c_name not in all_lab_course_names:
-                                course_name_display = c_name
-                                break
-                        if course_name_display == "None":
-                            for c_name, t_name_map in section_course_teacher[sec].items():
-                                if t_name_map == teacher_name_assigned:
-                                    course_name_display = c_name
-                                    break
-
-                    result[sec][d][slot] = {
-                        "course": course_name_display,
-                        "teacher": teacher_name_assigned or ""
-                    }
-
-    return {"status": "success", "timetable": result}
\ No newline at end of file
+    configure_solver(solver, options)
+    presolve_clock = PresolveClock(solver) if diagnostics["detailed"] else None
+    callback = TimetableSolutionCallback(timetable_model, on_solution) if on_solution else None
+    with timer.phase("solve"):
+        status = run_solver(solver, timetable_model.model, callback, stop_event)
+    report = solver_report(solver, status, options)
+    solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    diagnostics["status"] = report["status"]
+    diagnostics["solver"] = solver_stats(solver, presolve_clock)
+
+    cache_report = None
+    if cache is not None:
+        cache_report = {"hit": False, "warm_start": bool(hints)}
+        if hints and solved:
+            accepted = sum(1 for lit, value in hints if solver.BooleanValue(lit) == bool(value))
+            cache.record_hints(len(hints), accepted)
+            cache_report["hint_acceptance_rate"] = accepted / len(hints)
+
+    if not solved:
+        if status == cp_model.UNKNOWN:
+            message = "No timetable found within the time limit."
+        else:
+            message = "No feasible timetable found."
+        response = {"status": "failed", "message": message, "solver": report}
+        if status == cp_model.INFEASIBLE and options["explain_infeasibility"]:
+            with timer.phase("explain"):
+                # Only what the solve left of the time limit, so a failure stays within the budget
+                budget = remaining_time(options, timer.phases["solve"])["max_time_in_seconds"]
+                response["infeasibility"] = explain_infeasibility(data, budget, options["random_seed"])
+    else:
+        # Prepare the result in the expected format
+        with timer.phase("extract"):
+            result = timetable_model.extract(solver)
+        response = {"status": "success", "timetable": result, "solver": report}
+        if cache is not None:
+            cache.store(cache_key, data, response)
+        if not single:
+            with timer.phase("alternatives"):
+                response["alternatives"] = alternative_timetables(timetable_model, solver, options, stop_event)
+
+    if cache_report is not None:
+        response["cache"] = cache_report
+    if decomposition is not None:
+        decomposition.pop("partial_timetable", None)
+        response["decomposition"] = dict(decomposition, fallback=True)
+    if staging is not None:
+        response["staged"] = dict(staging, fallback=True)
+    return response
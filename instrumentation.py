@@ -0,0 +1,89 @@
+import contextlib
+import time
+
+
+class PhaseTimer:
+    """Wall-clock seconds spent in each named phase, in the order the phases first ran."""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def timed(timer, name):
+    return timer.phase(name) if timer is not None else contextlib.nullcontext()
+
+
+class PresolveClock:
+    """Measures CP-SAT's presolve from its log; turns search logging on for `solver`."""
+
+    def __init__(self, solver):
+        self.started = None
+        self.finished = None
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = self._on_log
+
+    def _on_log(self, line):
+        if self.started is None and line.startswith("Starting presolve"):
+            self.started = time.perf_counter()
+        elif self.finished is None and line.startswith("Presolved"):
+            self.finished = time.perf_counter()
+
+    @property
+    def presolve_time(self):
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+
+def solver_stats(solver, presolve_clock=None):
+    response = solver.ResponseProto()
+    stats = {
+        "wall_time": response.wall_time,
+        "user_time": response.user_time,
+        "deterministic_time": response.deterministic_time,
+        "conflicts": response.num_conflicts,
+        "branches": response.num_branches,
+        "restarts": response.num_restarts,
+        "binary_propagations": response.num_binary_propagations,
+        "integer_propagations": response.num_integer_propagations,
+        "lp_iterations": response.num_lp_iterations,
+        "booleans": response.num_booleans,
+    }
+    if presolve_clock is not None:
+        stats["presolve_time"] = presolve_clock.presolve_time
+    return stats
+
+
+def constraint_literals(constraint):
+    count = len(constraint.enforcement_literal)
+    for kind in ("bool_or", "bool_and", "at_most_one", "exactly_one", "bool_xor"):
+        if getattr(constraint, f"has_{kind}")():
+            return count + len(getattr(constraint, kind).literals)
+    if constraint.has_linear():
+        count += len(constraint.linear.vars)
+    return count
+
+
+def model_stats(timetable_model, literals=False):
+    """Variables and constraints added by each constraint family of a built model.
+
+    Derived literals (occupancy, teacher presence, ...) are counted in the family
+    that first needed them. With `literals`, also counts the literal/variable
+    references of each family's constraints, which walks the whole model.
+    """
+    proto = timetable_model.model.Proto()
+    families = {}
+    for family, (var_start, var_end, ct_start, ct_end) in timetable_model.families.items():
+        families[family] = {"variables": var_end - var_start, "constraints": ct_end - ct_start}
+        if literals:
+            families[family]["literals"] = sum(constraint_literals(proto.constraints[i]) for i in range(ct_start, ct_end))
+    return {"variables": len(proto.variables), "constraints": len(proto.constraints), "families": families}
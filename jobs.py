@@ -0,0 +1,147 @@
+import multiprocessing
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from generate_timetable import solve_timetable
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def run_job(data, events, cancel):
+    """Pool entry point: solve `data`, streaming progress into the `events` queue."""
+    if cancel.is_set():  # cancelled while waiting in the pool's call queue
+        events.put(("result", {"status": "failed", "message": "Job cancelled before it started."}))
+        return
+    events.put(("started", None))
+    try:
+        result = solve_timetable(data, on_solution=lambda solution: events.put(("solution", solution)), stop_event=cancel)
+    except Exception as exc:  # reported back to the client instead of killing the listener
+        result = {"status": "failed", "message": str(exc)}
+    events.put(("result", result))
+
+
+class Job:
+    def __init__(self, job_id, events, cancel):
+        self.job_id = job_id
+        self.status = QUEUED
+        self.events = events
+        self.cancel = cancel
+        self.future = None
+        self.solutions = []  # every improving solution, in the order the solver found them
+        self.result = None
+        self.changed = threading.Condition()
+
+    def snapshot(self):
+        with self.changed:
+            snapshot = {"job_id": self.job_id, "status": self.status, "solutions_found": len(self.solutions)}
+            if self.solutions:
+                snapshot["best"] = self.solutions[-1]
+            if self.result is not None:
+                snapshot["result"] = self.result
+            return snapshot
+
+
+class JobManager:
+    """Runs timetable solves in a bounded process pool and tracks their progress.
+
+    Each job gets a manager queue the worker process writes its solutions to and
+    a manager event the API sets to stop the search. A listener thread per job
+    folds the queue into the in-memory `Job` that the HTTP handlers read.
+    """
+
+    def __init__(self, max_workers=2, max_queued=16, max_finished=100):
+        context = multiprocessing.get_context("spawn")
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        self._manager = context.Manager()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+
+    def submit(self, data):
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if pending >= self.max_queued:
+                raise JobQueueFull(f"{pending} jobs are already waiting for a worker.")
+            job = Job(uuid.uuid4().hex, self._manager.Queue(), self._manager.Event())
+            # The future exists before the job is visible, so cancel() always finds it
+            job.future = self._pool.submit(run_job, data, job.events, job.cancel)
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+
+        job.future.add_done_callback(lambda future: self._on_done(job, future))
+        threading.Thread(target=self._listen, args=(job,), daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel.set()
+        if job.future.cancel():  # never started: there is no search to stop
+            job.events.put(("result", {"status": "failed", "message": "Job cancelled before it started."}))
+        return job
+
+    def stream(self, job):
+        """Yield ("solution", solution) for every improving solution, then ("done", snapshot)."""
+        sent = 0
+        while True:
+            with job.changed:
+                job.changed.wait_for(lambda: len(job.solutions) > sent or job.status in FINISHED_STATES)
+                pending = job.solutions[sent:]
+                finished = job.status in FINISHED_STATES
+            for solution in pending:
+                yield "solution", solution
+            sent += len(pending)
+            if finished:
+                yield "done", job.snapshot()
+                return
+
+    def _listen(self, job):
+        while True:
+            kind, payload = job.events.get()
+            with job.changed:
+                if kind == "started":
+                    job.status = RUNNING
+                elif kind == "solution":
+                    job.solutions.append(payload)
+                elif kind == "result":
+                    job.result = payload
+                    if job.cancel.is_set():
+                        job.status = CANCELLED
+                    else:
+                        job.status = SUCCEEDED if payload["status"] == "success" else FAILED
+                job.changed.notify_all()
+            if kind == "result":
+                return
+
+    def _on_done(self, job, future):
+        # Only reached without a "result" event when the worker process itself died
+        if not future.cancelled() and future.exception() is not None:
+            job.events.put(("result", {"status": "failed", "message": f"Solver process failed: {future.exception()}"}))
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            job.cancel.set()
+        self._pool.shutdown(cancel_futures=True)
+        self._manager.shutdown()
@@ -0,0 +1,96 @@
+import threading
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# name -> (type, help) of everything the service exports
+METRICS = {
+    "timetable_requests_total": ("counter", "HTTP requests by endpoint and response status."),
+    "timetable_request_duration_seconds": ("histogram", "HTTP request latency by endpoint."),
+    "timetable_phase_duration_seconds": ("histogram", "Time spent in each phase of solve_timetable."),
+    "timetable_solver_status_total": ("counter", "Solves by final CP-SAT status (PRECHECK for arithmetic rejections, CACHED for cache hits)."),
+    "timetable_solver_conflicts_total": ("counter", "CP-SAT conflicts summed over solves."),
+    "timetable_solver_branches_total": ("counter", "CP-SAT branches summed over solves."),
+    "timetable_model_variables": ("gauge", "Variables of the most recently built model."),
+    "timetable_model_constraints": ("gauge", "Constraints of the most recently built model."),
+    "timetable_cache_entries": ("gauge", "Result cache entries held in memory."),
+    "timetable_cache_lookups_total": ("counter", "Result cache lookups by outcome."),
+    "timetable_jobs_submitted_total": ("counter", "Background jobs accepted."),
+}
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+class Metrics:
+    """In-process counters, gauges and histograms rendered in the Prometheus text format.
+
+    Each gunicorn worker keeps its own numbers; scrape every worker or run one.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._values = {}  # (name, labels) -> value, for counters and gauges
+        self._histograms = {}  # (name, labels) -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._values[key] = value
+
+    def observe(self, name, value, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            histogram = self._histograms.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += value
+
+    def observe_solve(self, diagnostics):
+        """Fold the diagnostics of one solve_timetable call into the aggregates."""
+        for phase, seconds in diagnostics["phases"].items():
+            self.observe("timetable_phase_duration_seconds", seconds, {"phase": phase})
+        self.inc("timetable_solver_status_total", {"status": diagnostics["status"]})
+        solver = diagnostics.get("solver")
+        if solver:
+            self.inc("timetable_solver_conflicts_total", value=solver["conflicts"])
+            self.inc("timetable_solver_branches_total", value=solver["branches"])
+        model = diagnostics.get("model")
+        if model:
+            self.set("timetable_model_variables", model["variables"])
+            self.set("timetable_model_constraints", model["constraints"])
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: list(counts) for key, counts in self._histograms.items()}
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            samples = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+            series = sorted((labels, counts) for (metric, labels), counts in histograms.items() if metric == name)
+            if not samples and not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(dict(labels))} {value}")
+            for labels, counts in series:
+                labels = dict(labels)
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{name}_bucket{format_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {counts[-2]}")
+                lines.append(f"{name}_count{format_labels(labels)} {counts[-2]}")
+                lines.append(f"{name}_sum{format_labels(labels)} {counts[-1]}")
+        return "\n".join(lines) + "\n"
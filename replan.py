@@ -0,0 +1,128 @@
+import copy
+import time
+
+from ortools.sat.python import cp_model
+
+from generate_timetable import configure_solver, remaining_time, solver_options, solver_report
+from timetable_model import TimetableModel
+
+# Cost of moving one previously published session, in units of the idle-gap penalty
+DEFAULT_MOVE_WEIGHT = 10
+
+
+def apply_delta(data, delta):
+    """The problem `data` describes, with `delta` merged in.
+
+    Dict-valued keys are merged one level deep (two for section_course_teacher,
+    so a delta can reassign a single course of a section); a None value removes
+    the entry. teacher_unavailable entries are appended.
+    """
+    problem = copy.deepcopy({key: value for key, value in data.items() if key not in ("previous_timetable", "delta")})
+    for key, value in delta.items():
+        if key == "teacher_unavailable":
+            problem[key] = problem.get(key, []) + list(value)
+        elif isinstance(value, dict) and isinstance(problem.get(key), dict):
+            merged = problem[key]
+            for item, item_value in value.items():
+                if item_value is None:
+                    merged.pop(item, None)
+                elif isinstance(item_value, dict) and isinstance(merged.get(item), dict):
+                    merged[item] = {**merged[item], **item_value}
+                else:
+                    merged[item] = item_value
+        else:
+            problem[key] = value
+    return problem
+
+
+def affected_sections(old, new, previous, timetable_model):
+    """Sections whose requirements changed or whose published cells are no longer allowed."""
+    old_sct = old["section_course_teacher"]
+    new_sct = new["section_course_teacher"]
+    affected = set()
+    for sec in new["sections"]:
+        if sec not in old_sct or sec not in previous or old_sct[sec] != new_sct[sec]:
+            affected.add(sec)
+            continue
+        for course in new_sct[sec]:
+            if old["course_req"].get(course) != new["course_req"].get(course):
+                affected.add(sec)
+            if old["lab_course_sessions_needed"].get(course) != new["lab_course_sessions_needed"].get(course):
+                affected.add(sec)
+
+    unavailable = new.get("teacher_unavailable", [])
+    for sec in new["sections"]:
+        if sec in affected:
+            continue
+        for d in timetable_model.days:
+            for slot in timetable_model.time_slots:
+                if timetable_model.previous_course(previous, sec, d, slot) is None:
+                    affected.add(sec)
+                teacher = previous.get(sec, {}).get(d, {}).get(slot, {}).get("teacher")
+                for entry in unavailable:
+                    if entry["teacher"] == teacher and entry.get("day") in (None, d) and entry.get("slot") in (None, slot):
+                        affected.add(sec)
+    return affected
+
+
+def widen(neighborhood, problem):
+    """`neighborhood` plus every section sharing a teacher with it."""
+    sct = problem["section_course_teacher"]
+    teachers = {teacher for sec in neighborhood for teacher in sct[sec].values()}
+    widened = set(neighborhood)
+    for sec in problem["sections"]:
+        if teachers & set(sct[sec].values()):
+            widened.add(sec)
+    return widened
+
+
+def replan_timetable(data):
+    """Repair `data["previous_timetable"]` after `data["delta"]` with as few moved sessions as possible.
+
+    Sections the delta does not touch are frozen. Only the affected sections are
+    re-optimized; when that is infeasible the neighborhood grows by one ring of
+    teacher-sharing sections per round until it covers the whole problem. The
+    rounds share the time limit; no round starts once it is spent.
+    """
+    options = solver_options(data)
+    previous = data["previous_timetable"]
+    previous = previous.get("timetable", previous)  # accept a whole /generate-timetable response too
+    problem = apply_delta(data, data.get("delta", {}))
+    move_weight = data.get("move_weight", DEFAULT_MOVE_WEIGHT)
+    all_sections = set(problem["sections"])
+
+    neighborhood = affected_sections(data, problem, previous, TimetableModel(problem))
+    rounds = []
+    start = time.perf_counter()
+    while True:
+        timetable_model = TimetableModel(problem).build()
+        timetable_model.fix_cells(previous, [sec for sec in problem["sections"] if sec not in neighborhood])
+        moved = timetable_model.moved_sessions(previous, [sec for sec in problem["sections"] if sec in neighborhood])
+        timetable_model.model.Minimize(timetable_model.objective + move_weight * sum(moved))
+        timetable_model.add_hints(previous)
+
+        solver = cp_model.CpSolver()
+        configure_solver(solver, remaining_time(options, time.perf_counter() - start))
+        status = solver.Solve(timetable_model.model)
+        rounds.append({"sections": sorted(neighborhood), "status": solver.StatusName(status), "wall_time": solver.WallTime()})
+
+        if status != cp_model.INFEASIBLE or neighborhood == all_sections:
+            break
+        if remaining_time(options, time.perf_counter() - start)["max_time_in_seconds"] == 0.0:
+            status = cp_model.UNKNOWN  # out of time before the neighborhood could grow
+            break
+        widened = widen(neighborhood, problem)
+        neighborhood = widened if widened != neighborhood else all_sections
+
+    report = solver_report(solver, status, options)
+    replan_report = {"rounds": rounds, "neighborhood": sorted(neighborhood)}
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        if status == cp_model.UNKNOWN:
+            message = "No repaired timetable found within the time limit."
+        else:
+            message = "No feasible timetable found."
+        return {"status": "failed", "message": message, "solver": report, "replan": replan_report}
+
+    replan_report["moved_sessions"] = sum(1 for lit in moved if solver.BooleanValue(lit))
+    report["idle_penalty"] = solver.Value(timetable_model.objective)
+    return {"status": "success", "timetable": timetable_model.extract(solver), "solver": report, "replan": replan_report}
@@ -0,0 +1,61 @@
+import gzip
+
+# Compression level of gzipped responses; higher levels cost far more time than they save bytes
+GZIP_LEVEL = 6
+
+
+def compact_timetable(problem, timetable):
+    """`timetable` as interned name tables and one integer grid per section.
+
+    `grid[s][d * len(time_slots) + t]` is an index into `courses`, -1 for a free
+    cell, and `teachers[teacher_of[s][c]]` teaches course c to section s. The
+    tables come from `problem`, the payload's `CompiledProblem`.
+    """
+    num_slots = len(problem.time_slots)
+    grid = []
+    for sec in problem.sections:
+        cells = [-1] * (len(problem.days) * num_slots)
+        for d, slots in timetable.get(sec, {}).items():
+            for slot, cell in slots.items():
+                if cell["course"] != "None":
+                    cells[problem.day_id[d] * num_slots + problem.slot_id[slot]] = problem.course_id[cell["course"]]
+        grid.append(cells)
+    return {
+        "sections": problem.sections,
+        "days": problem.days,
+        "time_slots": problem.time_slots,
+        "courses": problem.courses,
+        "teachers": problem.teachers,
+        "teacher_of": problem.teacher_of.tolist(),
+        "grid": grid,
+    }
+
+
+def expand_timetable(compact):
+    """The section -> day -> slot timetable a compact one stands for."""
+    num_slots = len(compact["time_slots"])
+    timetable = {}
+    for sec, teacher_of, cells in zip(compact["sections"], compact["teacher_of"], compact["grid"]):
+        timetable[sec] = {}
+        for d_id, d in enumerate(compact["days"]):
+            timetable[sec][d] = {}
+            for t, slot in enumerate(compact["time_slots"]):
+                c = cells[d_id * num_slots + t]
+                if c < 0:
+                    timetable[sec][d][slot] = {"course": "None", "teacher": ""}
+                else:
+                    timetable[sec][d][slot] = {"course": compact["courses"][c], "teacher": compact["teachers"][teacher_of[c]]}
+    return timetable
+
+
+def compact_response(problem, response):
+    """Swap every timetable of `response` (the main one and the alternatives) for its compact form."""
+    if "timetable" in response:
+        response["timetable"] = compact_timetable(problem, response["timetable"])
+    for alternative in response.get("alternatives", []):
+        alternative["timetable"] = compact_timetable(problem, alternative["timetable"])
+    return response
+
+
+def gzip_body(body):
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
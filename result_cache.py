@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Request keys that describe the problem itself; anything else (e.g. "solver") only
+# changes how hard we search and is left out of the cache key.
+PROBLEM_KEYS = (
+    "sections", "num_of_classrooms", "num_of_labrooms", "course_req", "section_course_teacher",
+    "all_lab_course_names", "lab_course_sessions_needed", "time_slots", "lab_pairs", "blocked_cells",
+    "teacher_unavailable", "classroom_capacity", "labroom_capacity",
+)
+
+
+def normalize_problem(data):
+    problem = {key: data[key] for key in PROBLEM_KEYS if key in data}
+    # Order of these lists carries no meaning for the solver
+    for key in ("sections", "all_lab_course_names"):
+        if key in problem:
+            problem[key] = sorted(problem[key])
+    return problem
+
+
+def problem_key(problem):
+    canonical = json.dumps(problem, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def assignment_set(problem):
+    """(section, course, teacher) triples plus the per-course requirements, used to compare problems."""
+    items = set()
+    for sec, courses in problem.get("section_course_teacher", {}).items():
+        for course, teacher in courses.items():
+            items.add(("teaches", sec, course, teacher))
+    for course, req in problem.get("course_req", {}).items():
+        items.add(("req", course, req))
+    for course, req in problem.get("lab_course_sessions_needed", {}).items():
+        items.add(("lab_req", course, req))
+    return items
+
+
+def similarity(a, b):
+    if any(a.get(key) != b.get(key) for key in ("time_slots", "lab_pairs", "blocked_cells")):
+        return 0.0
+    items_a, items_b = assignment_set(a), assignment_set(b)
+    if not items_a and not items_b:
+        return 1.0
+    return len(items_a & items_b) / len(items_a | items_b)
+
+
+def proved_optimal(result):
+    # Entries stored before gap-limited solves were reported FEASIBLE can say OPTIMAL with an open gap
+    solver = result["solver"]
+    return solver["status"] == "OPTIMAL" and solver["objective"] <= solver["best_bound"]
+
+
+class ResultCache:
+    """Content-addressed cache of successful timetable responses.
+
+    Entries are keyed by the SHA-256 of the normalized problem and kept in an
+    in-memory LRU of `max_entries`. With a `directory`, entries are also written
+    there as JSON (at most `max_disk_entries`, oldest removed first) so they
+    survive restarts and are shared between gunicorn workers.
+    """
+
+    def __init__(self, max_entries=128, directory=None, max_disk_entries=1024, min_similarity=0.5):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.min_similarity = min_similarity
+        self._entries = OrderedDict()  # key -> {"problem": ..., "result": ...}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.near_hits = 0
+        self.hints_given = 0
+        self.hints_accepted = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def lookup(self, data):
+        """Return (key, result, warm_start).
+
+        `result` is a cached response for exactly this problem whose objective meets
+        its bound, so it can be returned as is. Otherwise `warm_start` is the cached
+        response closest to this problem (the same problem solved only to
+        feasibility counts as closest), or None.
+        """
+        problem = normalize_problem(data)
+        key = problem_key(problem)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is not None and proved_optimal(entry["result"]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return key, entry["result"], None
+
+            self.misses += 1
+            nearest = entry
+            if nearest is None:
+                # Only the in-memory entries are scanned; the disk backend serves exact matches
+                best = self.min_similarity
+                for candidate in self._entries.values():
+                    score = similarity(problem, candidate["problem"])
+                    if score >= best:
+                        nearest, best = candidate, score
+            if nearest is not None:
+                self.near_hits += 1
+                return key, None, nearest["result"]
+            return key, None, None
+
+    def store(self, key, data, result):
+        # Per-call sections describe this request, not the timetable
+        result = {name: value for name, value in result.items() if name not in ("cache", "diagnostics")}
+        entry = {"problem": normalize_problem(data), "result": result}
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and previous["result"]["solver"]["objective"] < result["solver"]["objective"]:
+                return  # keep the better timetable we already have
+            self._remember(key, entry)
+        if self.directory:
+            self._save(key, entry)
+
+    def record_hints(self, given, accepted):
+        with self._lock:
+            self.hints_given += given
+            self.hints_accepted += accepted
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "near_hits": self.near_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "hints_given": self.hints_given,
+                "hints_accepted": self.hints_accepted,
+                "hint_acceptance_rate": self.hints_accepted / self.hints_given if self.hints_given else 0.0,
+            }
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key, entry):
+        # Best effort: the entry is already in memory, so a failed write only loses the
+        # disk copy. Every writer gets its own temporary file, so workers sharing the
+        # directory can store the same key at once.
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if tmp_path is not None:
+                self._remove(tmp_path)
+            return
+
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        files = []
+        for name in names:
+            if name.endswith(".json"):
+                path = os.path.join(self.directory, name)
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass  # removed by another worker
+        if len(files) > self.max_disk_entries:
+            files.sort()
+            for _, path in files[:len(files) - self.max_disk_entries]:
+                self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
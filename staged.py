@@ -0,0 +1,150 @@
+import time
+
+from ortools.sat.python import cp_model
+
+from timetable_model import SYMMETRY_BREAKINGS, TimetableModel
+
+# Lab placements tried before falling back to the joint model
+MAX_STAGE_ATTEMPTS = 3
+
+
+def lab_model(data):
+    """Stage 1: only the lab blocks of `data` and the constraints between them.
+
+    Returns (timetable model, {(sec, course, d, pair): block literal}). Next to
+    lab-room capacity and one lab block per teacher per day, every teacher keeps
+    enough lab-free days for the theory classes they owe each section. The joint
+    model implies all of it, so an infeasible stage 1 means an infeasible problem.
+    """
+    timetable_model = TimetableModel(data)
+    model, problem = timetable_model.model, timetable_model.problem
+    blocks = {}
+    teacher_day_blocks = {}  # (teacher, d) -> blocks
+    for sec in timetable_model.sections:
+        for course in timetable_model.lab_courses[sec]:
+            teacher = timetable_model.section_course_teacher[sec][course]
+            t = problem.teacher_id[teacher]
+            for d_id, d in enumerate(timetable_model.days):
+                day_blocks = []
+                for pair in timetable_model.lab_pairs:
+                    block = timetable_model.lab_block(sec, course, d, pair)
+                    slots = [problem.slot_id[slot] for slot in pair]
+                    if not problem.usable[d_id, slots].all() or problem.unavailable[t, d_id, slots].any():
+                        model.Add(block == 0)
+                    blocks[(sec, course, d, pair)] = block
+                    day_blocks.append(block)
+                    teacher_day_blocks.setdefault((teacher, d), []).append(block)
+                model.AddAtMostOne(day_blocks)
+            sessions = [blocks[(sec, course, d, pair)] for d in timetable_model.days for pair in timetable_model.lab_pairs]
+            model.Add(sum(sessions) == timetable_model.lab_course_sessions_needed[course])
+
+        # Two labs of a section cannot share a block
+        if len(timetable_model.lab_courses[sec]) > 1:
+            for d in timetable_model.days:
+                for pair in timetable_model.lab_pairs:
+                    model.AddAtMostOne(blocks[(sec, course, d, pair)] for course in timetable_model.lab_courses[sec])
+
+    labrooms = problem.labrooms.tolist()
+    for d_id, d in enumerate(timetable_model.days):
+        for pair_id, pair in enumerate(timetable_model.lab_pairs):
+            simultaneous = [lit for (_, _, day, p), lit in blocks.items() if day == d and p == pair]
+            if simultaneous:
+                model.Add(sum(simultaneous) <= labrooms[d_id][pair_id])
+
+    # On a lab day the teacher sees no other section, and this one only inside the block
+    for day_blocks in teacher_day_blocks.values():
+        model.AddAtMostOne(day_blocks)
+
+    # A section gets at most one theory class a day from a teacher, never on the teacher's lab days
+    for teacher in timetable_model.all_teachers:
+        t = problem.teacher_id[teacher]
+        open_days = [d for d_id, d in enumerate(timetable_model.days) if (problem.usable[d_id] & ~problem.unavailable[t, d_id]).any()]
+        lab_days = [sum(teacher_day_blocks[(teacher, d)]) for d in open_days if (teacher, d) in teacher_day_blocks]
+        if not lab_days:
+            continue
+        for sec in timetable_model.teacher_sections(teacher):
+            owed = sum(timetable_model.course_req[c] for c in timetable_model.teacher_courses[sec][teacher] if c not in timetable_model.lab_names)
+            if owed:
+                model.Add(sum(lab_days) <= len(open_days) - owed)
+    return timetable_model, blocks
+
+
+def fixed_labs(timetable_model, placed):
+    """A copy of the built joint model with every lab block set as in `placed`."""
+    model = timetable_model.model.Clone()
+    for sec in timetable_model.sections:
+        for course in timetable_model.lab_courses[sec]:
+            for d in timetable_model.days:
+                for pair in timetable_model.lab_pairs:
+                    lit = model.GetBoolVarFromProtoIndex(timetable_model.lab_block(sec, course, d, pair).Index())
+                    model.Add(lit == int((sec, course, d, pair) in placed))
+    return model
+
+
+def solve_staged(data, options, on_solution=None, stop_event=None):
+    """Place the labs first, then schedule the theory classes around them.
+
+    Returns (response, staging report). Stage 1 places the lab blocks alone; stage
+    2 solves the joint model with those blocks fixed. When stage 2 is infeasible,
+    stage 1 is asked for a different placement, up to MAX_STAGE_ATTEMPTS times.
+    The response is None when no attempt gave a timetable (the report is None too
+    when there are no labs to place); the caller then solves the joint model. Both
+    stages share the time limit.
+
+    The stage-2 bound only holds for the fixed labs, so a staged timetable is
+    reported OPTIMAL only when it has no idle slots, and its `best_bound` is 0.
+    Stage 2 leaves out the symmetry-breaking strengthenings, which could cut off
+    every completion of the fixed labs.
+    """
+    # Imported here: generate_timetable imports this module
+    from generate_timetable import TimetableSolutionCallback, configure_solver, run_solver, solver_report
+
+    start = time.perf_counter()
+    limit = options["max_time_in_seconds"]
+
+    def remaining():
+        return None if limit is None else max(float(limit) - (time.perf_counter() - start), 0.0)
+
+    stage1, blocks = lab_model(data)
+    if not blocks:
+        return None, None
+    # Fixed labs break the symmetries, so stage 2 only takes the cuts the model implies
+    implied = [name for name in options["strengthen"] if name not in SYMMETRY_BREAKINGS]
+    stage2 = TimetableModel(data, strengthen=implied).build()
+    staging = {"attempts": []}
+    for attempt in range(MAX_STAGE_ATTEMPTS):
+        if remaining() == 0.0 or (stop_event is not None and stop_event.is_set()):
+            break
+        attempt_start = time.perf_counter()
+        solver = cp_model.CpSolver()
+        configure_solver(solver, dict(options, max_time_in_seconds=remaining(), random_seed=options["random_seed"] + attempt))
+        status = run_solver(solver, stage1.model, stop_event=stop_event)
+        stage1_time = time.perf_counter() - attempt_start
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            staging["attempts"].append({"stage1_time": stage1_time, "stage1_status": solver.StatusName(status)})
+            break
+        placed = {key for key, lit in blocks.items() if solver.BooleanValue(lit)}
+
+        solver = cp_model.CpSolver()
+        configure_solver(solver, dict(options, max_time_in_seconds=remaining()))
+        callback = TimetableSolutionCallback(stage2, on_solution) if on_solution else None
+        status = run_solver(solver, fixed_labs(stage2, placed), callback, stop_event)
+        staging["attempts"].append({
+            "stage1_time": stage1_time,
+            "stage2_time": time.perf_counter() - attempt_start - stage1_time,
+            "stage2_status": solver.StatusName(status),
+        })
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            report = solver_report(solver, status, options)
+            staging["stage2_best_bound"] = report["best_bound"]
+            report.update(
+                status="OPTIMAL" if report["objective"] <= 0 else "FEASIBLE",
+                best_bound=0.0,
+                wall_time=time.perf_counter() - start,
+            )
+            return {"status": "success", "timetable": stage2.extract(solver), "solver": report}, staging
+        if status != cp_model.INFEASIBLE:
+            break
+        # Ask stage 1 for a placement that differs in at least one block
+        stage1.model.AddBoolOr([blocks[key].Not() for key in placed])
+    return None, staging
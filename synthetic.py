@@ -0,0 +1,85 @@
+import argparse
+import json
+import math
+import random
+
+from timetable_model import BLOCKED_CELLS, DAYS, LAB_PAIRS, TIME_SLOTS
+
+# Upper bounds that keep a generated teacher schedulable: a lab session takes the
+# teacher's whole day, and a theory teacher sees each section at most once a day.
+MAX_LAB_SECTIONS_PER_TEACHER = 3
+MAX_THEORY_SECTIONS_PER_TEACHER = 5
+
+
+def usable_slots():
+    return sum(1 for d in DAYS for slot in TIME_SLOTS if (d, slot) not in BLOCKED_CELLS)
+
+
+def usable_lab_blocks():
+    return sum(1 for d in DAYS for pair in LAB_PAIRS if (d, pair[0]) not in BLOCKED_CELLS and (d, pair[1]) not in BLOCKED_CELLS)
+
+
+def generate_problem(sections=10, courses_per_section=6, teacher_sharing=0.5, lab_fraction=0.3, room_tightness=0.5, seed=0):
+    """A /generate-timetable payload for a synthetic department.
+
+    Every section takes the same `courses_per_section` courses, `lab_fraction` of
+    them labs. `teacher_sharing` runs from 0 (every section has its own teacher for
+    every course) to 1 (each teacher takes as many sections as they can fit).
+    `room_tightness` is the share of the week's room capacity the sessions fill on
+    average; near 1 the rooms become the bottleneck. The same arguments always give
+    the same payload.
+    """
+    rnd = random.Random(seed)
+    num_labs = min(round(courses_per_section * lab_fraction), courses_per_section)
+    theory = [f"TH{i + 1:02d}" for i in range(courses_per_section - num_labs)]
+    labs = [f"LAB{i + 1:02d}" for i in range(num_labs)]
+    section_names = [f"Section {i + 1}" for i in range(sections)]
+
+    course_req = {course: rnd.choice((2, 3, 3, 4)) for course in theory}
+    lab_sessions = {course: rnd.choice((1, 2)) for course in labs}
+    # Keep a section's week within the usable slots
+    while sum(course_req.values()) + 2 * sum(lab_sessions.values()) > usable_slots():
+        course = max(course_req, key=course_req.get)
+        course_req[course] -= 1
+
+    section_course_teacher = {sec: {} for sec in section_names}
+    for course in theory + labs:
+        if course in labs:
+            cap = max(1, MAX_LAB_SECTIONS_PER_TEACHER // lab_sessions[course])
+        else:
+            cap = MAX_THEORY_SECTIONS_PER_TEACHER
+        fewest = math.ceil(sections / cap)
+        num_teachers = max(fewest, round(sections - teacher_sharing * (sections - fewest)))
+        order = list(section_names)
+        rnd.shuffle(order)
+        for i, sec in enumerate(order):
+            section_course_teacher[sec][course] = f"Teacher {course}-{i % num_teachers + 1}"
+
+    theory_sessions = sections * sum(course_req.values())
+    lab_total = sections * sum(lab_sessions.values())
+    num_of_classrooms = min(sections, max(1, math.ceil(theory_sessions / (usable_slots() * room_tightness))))
+    num_of_labrooms = min(sections, max(1, math.ceil(lab_total / (usable_lab_blocks() * room_tightness)))) if labs else 0
+
+    return {
+        "sections": section_names,
+        "num_of_classrooms": num_of_classrooms,
+        "num_of_labrooms": num_of_labrooms,
+        "course_req": course_req,
+        "section_course_teacher": section_course_teacher,
+        "all_lab_course_names": labs,
+        "lab_course_sessions_needed": lab_sessions,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print a synthetic /generate-timetable payload.")
+    parser.add_argument("--sections", type=int, default=10)
+    parser.add_argument("--courses-per-section", type=int, default=6)
+    parser.add_argument("--teacher-sharing", type=float, default=0.5)
+    parser.add_argument("--lab-fraction", type=float, default=0.3)
+    parser.add_argument("--room-tightness", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(generate_problem(
+        args.sections, args.courses_per_section, args.teacher_sharing, args.lab_fraction, args.room_tightness, args.seed,
+    ), indent=2))
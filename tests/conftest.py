@@ -0,0 +1,32 @@
+import copy
+
+import pytest
+
+README_EXAMPLE = {
+    "sections": ["Section A", "Section B", "Section C"],
+    "num_of_classrooms": 2,
+    "num_of_labrooms": 1,
+    "course_req": {"CS101": 3, "CS102": 3, "CS103": 3, "CS107": 2},
+    "section_course_teacher": {
+        "Section A": {
+            "CS101": "Mr. Madhu", "CS102": "Mrs. Chandana", "CS103": "Dr. Ramesh",
+            "CS105": "Mrs. Shobha chandra K", "CS106": "Dr. Chandrika J", "CS107": "Mr. Keerthi K S",
+        },
+        "Section B": {
+            "CS101": "Ms. Harshita", "CS102": "Dr. Ramesh", "CS103": "Ms. Ayeesha",
+            "CS105": "Mr. Ravi Kumar D", "CS106": "Mrs. Shruthi A S", "CS107": "Mrs. Chandana",
+        },
+        "Section C": {
+            "CS101": "Mr. Ravi Kumar D", "CS102": "Mr. Tejonidhi M R", "CS103": "Mr. Keerthi K S",
+            "CS105": "Mrs. Nithyashree R", "CS106": "Ms. Harshita", "CS107": "Ms. Ayeesha",
+        },
+    },
+    "all_lab_course_names": ["CS105", "CS106"],
+    "lab_course_sessions_needed": {"CS105": 2, "CS106": 2},
+}
+
+
+@pytest.fixture
+def readme_example():
+    """The request payload of the README, a fresh copy per test."""
+    return copy.deepcopy(README_EXAMPLE)
@@ -0,0 +1,21 @@
+"""Mapping a payload onto the integer ids of compiled_problem.CompiledProblem."""
+from compiled_problem import CompiledProblem
+from timetable_model import TimetableModel
+
+
+def test_ids_follow_payload_order(readme_example):
+    problem = TimetableModel(readme_example).problem
+    assert problem.courses == ["CS101", "CS102", "CS103", "CS107", "CS105", "CS106"]
+    assert problem.is_lab.tolist() == [False, False, False, False, True, True]
+    assert problem.sessions.tolist() == [3, 3, 3, 2, 2, 2]
+    assert problem.teachers[problem.teacher_of[0, problem.course_id["CS105"]]] == "Mrs. Shobha chandra K"
+
+
+def test_catalog_lab_without_session_count(readme_example):
+    # Listed in all_lab_course_names but neither taken by a section nor given a session count
+    readme_example["all_lab_course_names"].append("CS999")
+    timetable_model = TimetableModel(readme_example).build()
+    problem = timetable_model.problem
+    assert isinstance(problem, CompiledProblem)
+    assert problem.sessions[problem.course_id["CS999"]] == 0
+    assert (problem.teacher_of[:, problem.course_id["CS999"]] == -1).all()
@@ -0,0 +1,35 @@
+"""Validation of the per-request daily grid (time_slots, lab_pairs, blocked_cells)."""
+import pytest
+
+from timetable_model import BLOCKED_CELLS, LAB_PAIRS, TIME_SLOTS, daily_grid
+
+SLOTS = [f"slot {j}" for j in range(8)]
+
+
+def test_defaults():
+    assert daily_grid({}) == (TIME_SLOTS, LAB_PAIRS, BLOCKED_CELLS)
+
+
+def test_custom_grid_keeping_the_blocked_slot_names_keeps_the_cutoff():
+    time_slots = TIME_SLOTS + ["4:00-5:00", "5:00-6:00"]
+    _, _, blocked_cells = daily_grid({"time_slots": time_slots})
+    assert blocked_cells == BLOCKED_CELLS
+
+
+def test_custom_grid_with_its_own_blocked_cells():
+    data = {"time_slots": SLOTS, "lab_pairs": [["slot 0", "slot 1"]], "blocked_cells": [["Saturday", "slot 7"]]}
+    assert daily_grid(data) == (SLOTS, [("slot 0", "slot 1")], [("Saturday", "slot 7")])
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"time_slots": []}, "non-empty"),
+    ({"time_slots": ["a", "a"]}, "repeat"),
+    ({"time_slots": SLOTS, "blocked_cells": []}, "two slots of time_slots"),
+    ({"time_slots": SLOTS, "lab_pairs": [["slot 0", "slot 2"]], "blocked_cells": []}, "adjacent"),
+    ({"time_slots": SLOTS, "lab_pairs": [["slot 0", "slot 1"], ["slot 1", "slot 2"]], "blocked_cells": []}, "overlaps"),
+    ({"time_slots": SLOTS, "lab_pairs": []}, "blocked_cells"),
+    ({"time_slots": SLOTS, "lab_pairs": [], "blocked_cells": [["Sunday", "slot 0"]]}, "blocked_cells"),
+])
+def test_malformed_grid_is_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        daily_grid(data)
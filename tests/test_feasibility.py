@@ -0,0 +1,61 @@
+"""Each arithmetic pre-check of feasibility.check_feasibility, and one payload none of them may reject."""
+import pytest
+
+from feasibility import check_feasibility
+from timetable_model import DAYS
+
+
+def only_on(teacher, days):
+    return [{"teacher": teacher, "day": d} for d in DAYS if d not in days]
+
+
+def too_many_slots(data):
+    data["course_req"]["CS101"] = 30
+
+
+def too_many_lab_sessions(data):
+    data["lab_course_sessions_needed"]["CS105"] = 7
+
+
+def teacher_with_too_many_labs(data):
+    data["lab_course_sessions_needed"]["CS105"] = 3
+    for courses in data["section_course_teacher"].values():
+        courses["CS105"] = "Mrs. Shobha chandra K"
+
+
+def overloaded_teacher(data):
+    for courses in data["section_course_teacher"].values():
+        courses["CS101"] = "Mr. Madhu"
+    data["teacher_unavailable"] = only_on("Mr. Madhu", ["Monday"])
+
+
+def teacher_with_too_few_days(data):
+    data["teacher_unavailable"] = only_on("Mr. Madhu", ["Monday", "Tuesday"])
+
+
+def too_few_labrooms(data):
+    data["num_of_labrooms"] = 1
+    data["lab_course_sessions_needed"] = {"CS105": 3, "CS106": 3}
+
+
+def too_few_classrooms(data):
+    data["num_of_classrooms"] = 1
+    data["course_req"]["CS107"] = 3
+
+
+@pytest.mark.parametrize("check, change", [
+    ("section_slots", too_many_slots),
+    ("lab_days", too_many_lab_sessions),
+    ("teacher_lab_days", teacher_with_too_many_labs),
+    ("teacher_load", overloaded_teacher),
+    ("teacher_daily_cap", teacher_with_too_few_days),
+    ("labrooms", too_few_labrooms),
+    ("classrooms", too_few_classrooms),
+])
+def test_check_flags_impossible_payload(readme_example, check, change):
+    change(readme_example)
+    assert check in {problem["check"] for problem in check_feasibility(readme_example)}
+
+
+def test_readme_example_passes(readme_example):
+    assert check_feasibility(readme_example) == []
@@ -0,0 +1,113 @@
+"""Regression tests for the compactness objective (sum over section-days of squared internal idles)."""
+import random
+
+import pytest
+from ortools.sat.python import cp_model
+
+from synthetic import generate_problem
+from timetable_model import DAYS, STRENGTHENINGS, TimetableModel
+
+
+def idle_penalty(pattern):
+    """Sum over days of the squared number of free slots between the day's first and last class."""
+    penalty = 0
+    for day in pattern:
+        classes = [j for j, cell in enumerate(day) if cell == "1"]
+        if classes:
+            idles = sum(1 for j in range(classes[0], classes[-1]) if day[j] == "0")
+            penalty += idles * idles
+    return penalty
+
+
+def pattern_problem(pattern):
+    """One section whose week holds exactly the classes of `pattern` (one "0"/"1" string per day)."""
+    num_slots = len(pattern[0])
+    sessions = sum(day.count("1") for day in pattern)
+    courses = [f"C{i}" for i in range(sessions)]
+    return {
+        "sections": ["S"],
+        "num_of_classrooms": 1,
+        "num_of_labrooms": 1,
+        "course_req": {course: 1 for course in courses},
+        "section_course_teacher": {"S": {course: f"Teacher {course}" for course in courses}},
+        "all_lab_course_names": [],
+        "lab_course_sessions_needed": {},
+        "time_slots": [f"slot {j}" for j in range(num_slots)],
+        "lab_pairs": [],
+        "blocked_cells": [],
+    }
+
+
+def solve(timetable_model, seed=1):
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 8
+    solver.parameters.random_seed = seed
+    solver.parameters.max_time_in_seconds = 60
+    status = solver.Solve(timetable_model.model)
+    return solver, status
+
+
+PATTERNS = [
+    ["111000", "101000", "100001", "010010", "000000", "110011"],
+    ["10000001", "10101010", "11100111", "00011000", "10010010", "00000001"],
+    ["1000000001", "1100110011", "0101010101", "1111111111", "0010000100", "1000100000"],
+]
+
+
+@pytest.mark.parametrize("pattern", PATTERNS, ids=lambda pattern: f"{len(pattern[0])}slots")
+def test_objective_matches_idle_count_of_fixed_occupancy(pattern):
+    timetable_model = TimetableModel(pattern_problem(pattern)).build()
+    for d, day in zip(DAYS, pattern):
+        for slot, cell in zip(timetable_model.time_slots, day):
+            timetable_model.model.Add(timetable_model.occupied("S", d, slot) == int(cell == "1"))
+    solver, status = solve(timetable_model)
+    assert status == cp_model.OPTIMAL
+    assert solver.ObjectiveValue() == idle_penalty(pattern)
+
+
+def test_forced_idle_is_minimised():
+    # Monday only; A can only teach first and B only fourth, so C belongs in between
+    data = dict(
+        pattern_problem(["111000"]),
+        blocked_cells=[[d, f"slot {j}"] for d in DAYS[1:] for j in range(6)],
+        teacher_unavailable=[
+            *({"teacher": "Teacher C0", "slot": f"slot {j}"} for j in range(1, 6)),
+            *({"teacher": "Teacher C1", "slot": f"slot {j}"} for j in range(6) if j != 3),
+        ],
+    )
+    solver, status = solve(TimetableModel(data).build())
+    assert status == cp_model.OPTIMAL
+    assert solver.ObjectiveValue() == 1
+
+
+def positive_optimum_problem():
+    """Four sections sharing their theory teachers, half of whom miss the late-morning slots; the optimum is 3."""
+    data = generate_problem(4, courses_per_section=9, teacher_sharing=1.0, room_tightness=0.9, seed=1)
+    teachers = sorted({t for courses in data["section_course_teacher"].values() for t in courses.values()})
+    data["teacher_unavailable"] = [
+        {"teacher": teacher, "slot": slot}
+        for teacher in random.Random(1).sample(teachers, len(teachers) // 2)
+        for slot in ("11:00-12:00", "12:00-1:00")
+    ]
+    return data
+
+
+@pytest.mark.parametrize("strengthen", [()] + [(name,) for name in STRENGTHENINGS] + [STRENGTHENINGS], ids=lambda s: "+".join(s) or "none")
+def test_strengthening_keeps_the_optimum(strengthen):
+    solver, status = solve(TimetableModel(positive_optimum_problem(), strengthen=strengthen).build())
+    assert status == cp_model.OPTIMAL
+    assert solver.ObjectiveValue() == 3
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_readme_example_objective(readme_example, seed):
+    timetable_model = TimetableModel(readme_example).build()
+    solver, status = solve(timetable_model, seed)
+    assert status == cp_model.OPTIMAL
+    assert solver.ObjectiveValue() == 0
+    timetable = timetable_model.extract(solver)
+    pattern = {
+        sec: ["".join("0" if cell["course"] == "None" else "1" for cell in timetable[sec][d].values()) for d in DAYS]
+        for sec in readme_example["sections"]
+    }
+    assert sum(idle_penalty(days) for days in pattern.values()) == 0
@@ -0,0 +1,49 @@
+"""The pure helpers of the re-planning endpoint."""
+from replan import apply_delta, widen
+
+PROBLEM = {
+    "sections": ["A", "B", "C"],
+    "num_of_classrooms": 2,
+    "course_req": {"T1": 3, "T2": 2},
+    "section_course_teacher": {
+        "A": {"T1": "Ann", "T2": "Bob"},
+        "B": {"T1": "Ann", "T2": "Cid"},
+        "C": {"T1": "Dan", "T2": "Eve"},
+    },
+    "teacher_unavailable": [{"teacher": "Bob", "day": "Monday"}],
+}
+
+
+def test_nested_section_course_teacher_delta_reassigns_one_course():
+    problem = apply_delta(PROBLEM, {"section_course_teacher": {"A": {"T2": "Cid"}}})
+    assert problem["section_course_teacher"]["A"] == {"T1": "Ann", "T2": "Cid"}
+    assert problem["section_course_teacher"]["B"] == PROBLEM["section_course_teacher"]["B"]
+    assert PROBLEM["section_course_teacher"]["A"]["T2"] == "Bob"  # the request is not modified
+
+
+def test_none_removes_an_entry():
+    problem = apply_delta(PROBLEM, {"course_req": {"T2": None}, "section_course_teacher": {"C": None}})
+    assert problem["course_req"] == {"T1": 3}
+    assert "C" not in problem["section_course_teacher"]
+
+
+def test_scalars_are_replaced_and_unavailability_appended():
+    problem = apply_delta(PROBLEM, {"num_of_classrooms": 1, "teacher_unavailable": [{"teacher": "Ann", "slot": "8:30-9:30"}]})
+    assert problem["num_of_classrooms"] == 1
+    assert problem["teacher_unavailable"] == [{"teacher": "Bob", "day": "Monday"}, {"teacher": "Ann", "slot": "8:30-9:30"}]
+
+
+def test_delta_drops_previous_timetable_and_delta():
+    problem = apply_delta(dict(PROBLEM, previous_timetable={}, delta={}), {})
+    assert "previous_timetable" not in problem and "delta" not in problem
+
+
+def test_widen_adds_teacher_sharing_sections():
+    assert widen({"A"}, PROBLEM) == {"A", "B"}
+    assert widen({"A", "B"}, PROBLEM) == {"A", "B"}
+    assert widen({"C"}, PROBLEM) == {"C"}
+
+
+def test_widen_from_an_empty_neighborhood_stays_empty():
+    # replan_timetable then jumps straight to the whole problem
+    assert widen(set(), PROBLEM) == set()
@@ -0,0 +1,25 @@
+"""Round trip of the compact response format against the nested timetable it replaces."""
+import json
+
+from ortools.sat.python import cp_model
+
+from response_format import compact_timetable, expand_timetable
+from timetable_model import TimetableModel
+
+
+def test_compact_timetable_round_trip(readme_example):
+    timetable_model = TimetableModel(readme_example).build()
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 8
+    solver.parameters.random_seed = 1
+    solver.parameters.max_time_in_seconds = 60
+    assert solver.Solve(timetable_model.model) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    timetable = timetable_model.extract(solver)
+
+    cells = [cell for days in timetable.values() for slots in days.values() for cell in slots.values()]
+    assert any(cell["course"] in readme_example["all_lab_course_names"] for cell in cells)
+    assert any(cell["course"] == "None" for cell in cells)
+
+    compact = compact_timetable(timetable_model.problem, timetable)
+    assert expand_timetable(compact) == timetable
+    assert expand_timetable(json.loads(json.dumps(compact))) == timetable
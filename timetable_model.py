@@ -0,0 +1,755 @@
+import math
+import time
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from compiled_problem import CompiledProblem
+from instrumentation import timed
+
+# Days and time slots
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+TIME_SLOTS = ["8:30-9:30", "9:30-10:30", "11:00-12:00", "12:00-1:00", "2:00-3:00", "3:00-4:00"]
+LAB_PAIRS = [("8:30-9:30", "9:30-10:30"), ("11:00-12:00", "12:00-1:00"), ("2:00-3:00", "3:00-4:00")]
+BLOCKED_CELLS = [("Saturday", "2:00-3:00"), ("Saturday", "3:00-4:00")]
+
+# Optional constraints that only tighten the model: symmetry breaking that keeps
+# one timetable of every symmetric family, and cuts implied by the model
+STRENGTHENINGS = ("day_order", "mirror_days", "section_order", "teacher_load", "room_load", "idle_bound")
+# The symmetry-breaking ones; they only hold where the whole symmetric search space is open
+SYMMETRY_BREAKINGS = ("day_order", "mirror_days", "section_order")
+# Per-section time limit of the solves behind the "idle_bound" strengthening, and
+# their total per model; sections left when the total is spent add no bound
+IDLE_BOUND_TIME_LIMIT = 1.0
+IDLE_BOUND_TOTAL_TIME = 5.0
+
+
+def daily_grid(data):
+    """(time slots, lab pairs, blocked cells) of `data`, checked.
+
+    The optional "time_slots" and "lab_pairs" fields replace the default grid;
+    every lab pair must be two adjacent slots of `time_slots`, and a slot can be
+    in at most one pair. Blocked cells are (day, slot) names, so the default
+    Saturday afternoon cutoff carries over to a custom grid that keeps those slot
+    names. A grid that drops any of them must list its own "blocked_cells"
+    ([[day, slot], ...], possibly empty). Raises ValueError on a malformed grid.
+    """
+    time_slots = data.get("time_slots", TIME_SLOTS)
+    if not isinstance(time_slots, list) or not time_slots or not all(isinstance(slot, str) for slot in time_slots):
+        raise ValueError("time_slots must be a non-empty list of slot names")
+    if len(set(time_slots)) != len(time_slots):
+        raise ValueError("time_slots must not repeat a slot")
+    position = {slot: i for i, slot in enumerate(time_slots)}
+
+    lab_pairs = data.get("lab_pairs", LAB_PAIRS)
+    if not isinstance(lab_pairs, (list, tuple)):
+        raise ValueError("lab_pairs must be a list of [slot, slot] pairs")
+    paired = set()
+    for pair in lab_pairs:
+        if not isinstance(pair, (list, tuple)) or len(pair) != 2 or not all(slot in position for slot in pair):
+            raise ValueError(f"Lab pair {list(pair) if isinstance(pair, (list, tuple)) else pair} must be two slots of time_slots")
+        if position[pair[1]] != position[pair[0]] + 1:
+            raise ValueError(f"Lab pair {list(pair)} must be two adjacent slots of time_slots")
+        if paired & set(pair):
+            raise ValueError(f"Lab pair {list(pair)} overlaps another lab pair")
+        paired.update(pair)
+
+    if "blocked_cells" in data:
+        blocked_cells = data["blocked_cells"]
+        if not isinstance(blocked_cells, list) or not all(
+            isinstance(cell, (list, tuple)) and len(cell) == 2 and cell[0] in DAYS and cell[1] in position
+            for cell in blocked_cells
+        ):
+            raise ValueError("blocked_cells must be a list of [day, slot] pairs from the days and time_slots")
+    else:
+        blocked_cells = BLOCKED_CELLS
+        missing = sorted({slot for _, slot in blocked_cells if slot not in position})
+        if missing:
+            raise ValueError(f"time_slots drops the blocked slots {', '.join(missing)}; list the cells to block in blocked_cells")
+    return list(time_slots), [tuple(pair) for pair in lab_pairs], [tuple(cell) for cell in blocked_cells]
+
+
+def clean_name(text):
+    return text.replace(':', '').replace('-', '').replace(' ', '')
+
+
+class LiteralCache:
+    """Memoizing store for the boolean literals of a model.
+
+    Every fact about the schedule ("course c of section s sits in this cell",
+    "this cell is occupied", ...) is keyed by a tuple and exists exactly once.
+    The factory passed to `get` creates the literal and posts its defining
+    constraints; it only runs the first time a key is requested.
+    """
+
+    def __init__(self):
+        self._literals = {}
+        self.hits = 0
+
+    def get(self, key, factory):
+        lit = self._literals.get(key)
+        if lit is None:
+            lit = factory()
+            self._literals[key] = lit
+        else:
+            self.hits += 1
+        return lit
+
+    def __contains__(self, key):
+        return key in self._literals
+
+    def __len__(self):
+        return len(self._literals)
+
+    def items(self):
+        return self._literals.items()
+
+
+class TimetableModel:
+    """CP-SAT model with one boolean per (section, course, day, slot).
+
+    Theory courses get a literal per cell. Lab courses only ever sit in a lab
+    pair, so the literal of a lab course in either slot of a pair *is* the
+    activation literal of that lab block. Everything else (cell occupancy,
+    teacher presence, idle bookkeeping) is derived from those literals through
+    the shared `LiteralCache`.
+
+    Variables are left unnamed unless `names` is set, which is only worth it when
+    exporting a model to read it. `strengthen` names the STRENGTHENINGS to add.
+    """
+
+    def __init__(self, data, explain=False, names=False, strengthen=()):
+        # Extract data from input
+        self.sections = data["sections"]
+        self.section_course_teacher = data["section_course_teacher"]
+        self.course_req = data["course_req"]
+        self.num_of_classrooms = data["num_of_classrooms"]
+        self.num_of_labrooms = data["num_of_labrooms"]
+        self.all_lab_course_names = data["all_lab_course_names"]
+        self.lab_course_sessions_needed = data["lab_course_sessions_needed"]
+
+        # The daily grid may be overridden per request; the defaults are the college's week
+        self.days = DAYS
+        self.time_slots, self.lab_pairs, self.blocked_cells = daily_grid(data)
+        # [{"teacher": ..., "day": optional, "slot": optional}]; a missing day/slot means all of them
+        self.teacher_unavailable = data.get("teacher_unavailable", [])
+        # Optional per-cell room counts ({day: {slot: n}}, labs keyed by the first slot of
+        # the pair); cells not listed get the full num_of_classrooms / num_of_labrooms
+        self.classroom_capacity = data.get("classroom_capacity", {})
+        self.labroom_capacity = data.get("labroom_capacity", {})
+
+        self.model = cp_model.CpModel()
+        self.lits = LiteralCache()
+        # With `explain`, each constraint group is guarded by an assumption literal
+        # (group name -> literal) so CP-SAT can name the groups behind an infeasibility
+        self.explain = explain
+        self.groups = {}
+        self.names = names
+        self.strengthen = strengthen
+        self.data = data
+        # family -> (first variable, end variable, first constraint, end constraint) it added
+        self.families = {}
+        self._extraction = None  # see extraction_table
+
+        # ----------------------------
+        # Preprocessing
+        # ----------------------------
+        self.lab_names = lab_names = set(self.all_lab_course_names)
+        self.lab_courses = {}  # sec -> [lab course]
+        self.theory_courses = {}  # sec -> [theory course]
+        self.teacher_courses = {}  # sec -> {teacher: [course]}
+        for sec in self.sections:
+            taken = self.section_course_teacher[sec]
+            self.lab_courses[sec] = [c for c, t in taken.items() if t and c in lab_names]
+            self.theory_courses[sec] = [c for c in self.course_req if taken.get(c) and c not in lab_names]
+            self.teacher_courses[sec] = {}
+            for c in self.theory_courses[sec] + self.lab_courses[sec]:
+                self.teacher_courses[sec].setdefault(taken[c], []).append(c)
+
+        self.all_teachers = sorted({t for sec in self.sections for t in self.teacher_courses[sec]})
+        self.pair_of_slot = {}
+        for pair in self.lab_pairs:
+            for slot in pair:
+                self.pair_of_slot[slot] = pair
+
+        # Integer ids and index arrays the constraint blocks are built from
+        self.problem = CompiledProblem(data, self.days, self.time_slots, self.lab_pairs, self.blocked_cells)
+
+    def teacher_sections(self, teacher):
+        """Sections `teacher` teaches, in section order."""
+        problem = self.problem
+        return [problem.sections[s] for s in problem.teacher_sections[problem.teacher_id[teacher]]]
+
+    # ----------------------------
+    # Literals
+    # ----------------------------
+    def lab_block(self, sec, course, d, pair):
+        """True if lab `course` of `sec` runs in the (d, pair) block."""
+        def make():
+            s1, s2 = pair
+            return self.model.NewBoolVar(f"lab_active_{sec}_{clean_name(course)}_{d}_{clean_name(s1)}_{clean_name(s2)}" if self.names else "")
+        return self.lits.get(("lab", sec, course, d, pair), make)
+
+    def course_at(self, sec, course, d, slot):
+        """True if `course` is taught to `sec` in (d, slot); None if it never can be."""
+        if course in self.lab_names:
+            pair = self.pair_of_slot.get(slot)
+            if pair is None:
+                return None
+            return self.lab_block(sec, course, d, pair)
+
+        def make():
+            return self.model.NewBoolVar(f"occ_theory_{sec}_{clean_name(course)}_{d}_{clean_name(slot)}" if self.names else "")
+        return self.lits.get(("course", sec, course, d, slot), make)
+
+    def cell_courses(self, sec, d, slot):
+        """(course, literal) for every course that may occupy (sec, d, slot)."""
+        cell = []
+        for course in self.theory_courses[sec] + self.lab_courses[sec]:
+            lit = self.course_at(sec, course, d, slot)
+            if lit is not None:
+                cell.append((course, lit))
+        return cell
+
+    def occupied(self, sec, d, slot):
+        """True if (sec, d, slot) holds any class. Defining it also caps the cell at one course.
+
+        Occupancy is split into a theory part and a lab part rather than summed
+        over every course directly; the per-cell classroom literal keeps the
+        room-capacity constraint a small cardinality over sections, which
+        propagates much better than a sum over every theory course.
+        """
+        def make():
+            lit = self.model.NewBoolVar(f"used_{sec}_{d}_{clean_name(slot)}" if self.names else "")
+            self.model.Add(self.in_classroom(sec, d, slot) + self.in_lab(sec, d, slot) == lit)
+            return lit
+        return self.lits.get(("occupied", sec, d, slot), make)
+
+    def in_lab(self, sec, d, slot):
+        """True if (sec, d, slot) is part of an active lab block."""
+        def make():
+            lit = self.model.NewBoolVar(f"is_part_of_any_lab_{sec}_{d}_{clean_name(slot)}" if self.names else "")
+            blocks = [self.course_at(sec, c, d, slot) for c in self.lab_courses[sec]]
+            self.model.Add(sum(b for b in blocks if b is not None) == lit)
+            return lit
+        return self.lits.get(("lab_cell", sec, d, slot), make)
+
+    def in_classroom(self, sec, d, slot):
+        """True if (sec, d, slot) holds a theory class, i.e. uses a general classroom."""
+        def make():
+            lit = self.model.NewBoolVar(f"uses_gen_room_{sec}_{d}_{clean_name(slot)}" if self.names else "")
+            self.model.Add(sum(self.course_at(sec, c, d, slot) for c in self.theory_courses[sec]) == lit)
+            return lit
+        return self.lits.get(("classroom", sec, d, slot), make)
+
+    def teacher_busy(self, sec, teacher, d, slot):
+        """True if `teacher` teaches `sec` in (d, slot); None if they never can."""
+        lits = [self.course_at(sec, c, d, slot) for c in self.teacher_courses[sec].get(teacher, [])]
+        lits = [l for l in lits if l is not None]
+        if not lits:
+            return None
+        if len(lits) == 1:
+            return lits[0]
+
+        def make():
+            lit = self.model.NewBoolVar(f"tb_{clean_name(teacher)}_{sec}_{d}_{clean_name(slot)}" if self.names else "")
+            self.model.Add(sum(lits) == lit)
+            return lit
+        return self.lits.get(("teacher", sec, teacher, d, slot), make)
+
+    def started(self, sec, d, j):
+        """True if (sec, d) has a class in some slot at or before index j (running OR)."""
+        def make():
+            lit = self.model.NewBoolVar(f"started_{sec}_{d}_{j}" if self.names else "")
+            occ = self.occupied(sec, d, self.time_slots[j])
+            if j == 0:
+                self.model.Add(lit == occ)
+            else:
+                prev = self.started(sec, d, j - 1)
+                self.model.AddBoolOr([prev, occ]).OnlyEnforceIf(lit)
+                self.model.AddImplication(prev, lit)
+                self.model.AddImplication(occ, lit)
+            return lit
+        return self.lits.get(("started", sec, d, j), make)
+
+    def pending(self, sec, d, j):
+        """True if (sec, d) has a class in some slot at or after index j (running OR from the end)."""
+        def make():
+            lit = self.model.NewBoolVar(f"pending_{sec}_{d}_{j}" if self.names else "")
+            occ = self.occupied(sec, d, self.time_slots[j])
+            if j == len(self.time_slots) - 1:
+                self.model.Add(lit == occ)
+            else:
+                nxt = self.pending(sec, d, j + 1)
+                self.model.AddBoolOr([nxt, occ]).OnlyEnforceIf(lit)
+                self.model.AddImplication(nxt, lit)
+                self.model.AddImplication(occ, lit)
+            return lit
+        return self.lits.get(("pending", sec, d, j), make)
+
+    # ----------------------------
+    # Model building
+    # ----------------------------
+    def build(self, timer=None):
+        """Add every constraint family, timing each one with `timer` (a PhaseTimer) if given."""
+        families = [
+            ("cells", self._add_cell_constraints),
+            ("theory", self._add_theory_constraints),
+            ("labs", self._add_lab_constraints),
+            ("teachers", self._add_teacher_constraints),
+            ("classrooms", self._add_classroom_constraints),
+            ("availability", self._add_availability_constraints),
+        ]
+        if not self.explain:
+            families.append(("objective", self._add_compactness_objective))
+            if self.strengthen:
+                families.append(("strengthening", self._add_strengthening))
+        for family, add in families:
+            proto = self.model.Proto()
+            var_start, ct_start = len(proto.variables), len(proto.constraints)
+            with timed(timer, f"build.{family}"):
+                add()
+            proto = self.model.Proto()
+            self.families[family] = (var_start, len(proto.variables), ct_start, len(proto.constraints))
+        if self.explain:
+            self.model.AddAssumptions(list(self.groups.values()))
+        return self
+
+    def enforce(self, constraint, group):
+        """Tie `constraint` to the assumption literal of `group` when explaining."""
+        if self.explain:
+            if group not in self.groups:
+                self.groups[group] = self.model.NewBoolVar(f"group_{clean_name(group)}")
+            constraint.OnlyEnforceIf(self.groups[group])
+        return constraint
+
+    def _add_cell_constraints(self):
+        # At most one course per cell, and exactly the required number of non-empty slots per section
+        for sec, total_required_slots in zip(self.sections, self.problem.required_slots.tolist()):
+            used = [self.occupied(sec, d, slot) for d in self.days for slot in self.time_slots]
+            self.enforce(self.model.Add(sum(used) == total_required_slots), f"total sessions of {sec}")
+
+        # Saturday cutoff
+        blocked = [(self.days[d], self.time_slots[t]) for d, t in zip(*(~self.problem.usable).nonzero())]
+        for sec in self.sections:
+            for d, slot in blocked:
+                self.model.Add(self.occupied(sec, d, slot) == 0)
+
+    def _add_theory_constraints(self):
+        for sec in self.sections:
+            for course in self.theory_courses[sec]:
+                occurrences = [self.course_at(sec, course, d, slot) for d in self.days for slot in self.time_slots]
+                self.enforce(self.model.Add(sum(occurrences) == self.course_req[course]), f"required sessions of {course} for {sec}")
+
+    def _add_lab_constraints(self):
+        for sec in self.sections:
+            for course in self.lab_courses[sec]:
+                teacher = self.section_course_teacher[sec][course]
+                exclusivity = f"lab-day exclusivity of {teacher}"
+                other_sections = [other for other in self.teacher_sections(teacher) if other != sec]
+                blocks = [self.lab_block(sec, course, d, pair) for d in self.days for pair in self.lab_pairs]
+                self.enforce(self.model.Add(sum(blocks) == self.lab_course_sessions_needed[course]), f"required sessions of {course} for {sec}")
+
+                for d in self.days:
+                    # Lab exclusivity (within section): the lab teacher sees this section
+                    # only inside the active block on that day
+                    day_blocks = [self.lab_block(sec, course, d, pair) for pair in self.lab_pairs]
+                    self.enforce(self.model.AddAtMostOne(day_blocks), f"one {course} lab per day for {sec}")
+                    for pair in self.lab_pairs:
+                        block = self.lab_block(sec, course, d, pair)
+                        for other in self.teacher_courses[sec][teacher]:
+                            if other == course:
+                                continue
+                            for slot in self.time_slots:
+                                if slot in pair:
+                                    continue
+                                lit = self.course_at(sec, other, d, slot)
+                                if lit is not None:
+                                    self.enforce(self.model.AddImplication(block, lit.Not()), exclusivity)
+
+                        # Cross-section lab-day exclusivity for teachers
+                        for other_sec in other_sections:
+                            for slot in self.time_slots:
+                                busy = self.teacher_busy(other_sec, teacher, d, slot)
+                                if busy is not None:
+                                    self.enforce(self.model.AddImplication(block, busy.Not()), exclusivity)
+
+        # Lab-room capacity
+        labrooms = self.problem.labrooms.tolist()
+        for d_id, d in enumerate(self.days):
+            for pair_id, pair in enumerate(self.lab_pairs):
+                simultaneous = [self.lab_block(sec, course, d, pair) for sec in self.sections for course in self.lab_courses[sec]]
+                if simultaneous:
+                    self.enforce(self.model.Add(sum(simultaneous) <= labrooms[d_id][pair_id]), "lab-room capacity")
+
+    def _add_teacher_constraints(self):
+        for teacher in self.all_teachers:
+            sections = self.teacher_sections(teacher)
+            double_booking = f"no double booking of {teacher}"
+            for d in self.days:
+                # No teacher double-booking in same slot across sections
+                for slot in self.time_slots:
+                    in_slot = [self.teacher_busy(sec, teacher, d, slot) for sec in sections]
+                    in_slot = [l for l in in_slot if l is not None]
+                    if len(in_slot) > 1:
+                        self.enforce(self.model.AddAtMostOne(in_slot), double_booking)
+
+                # A teacher teaches at most one theory class per day per section. On a day
+                # the teacher runs a lab for the section, lab exclusivity already keeps them
+                # out of every other slot, so the cap can be posted unconditionally.
+                for sec in sections:
+                    daily = [
+                        self.course_at(sec, c, d, slot)
+                        for c in self.teacher_courses[sec].get(teacher, [])
+                        if c in self.theory_courses[sec]
+                        for slot in self.time_slots
+                    ]
+                    if len(daily) > 1:
+                        self.enforce(self.model.AddAtMostOne(daily), f"one theory class per day of {teacher} for {sec}")
+
+    def _add_classroom_constraints(self):
+        classrooms = self.problem.classrooms.tolist()
+        with_theory = [sec for sec in self.sections if self.theory_courses[sec]]
+        for d_id, d in enumerate(self.days):
+            for slot_id, slot in enumerate(self.time_slots):
+                theory_in_slot = [self.in_classroom(sec, d, slot) for sec in with_theory]
+                if theory_in_slot:
+                    self.enforce(self.model.Add(sum(theory_in_slot) <= classrooms[d_id][slot_id]), "classroom capacity")
+
+    def _add_availability_constraints(self):
+        problem = self.problem
+        for t, d, slot in zip(*problem.unavailable.nonzero()):
+            teacher = problem.teachers[t]
+            for s in problem.teacher_sections[t]:
+                busy = self.teacher_busy(problem.sections[s], teacher, self.days[d], self.time_slots[slot])
+                if busy is not None:
+                    self.enforce(self.model.Add(busy == 0), f"unavailability of {teacher}")
+
+    def _add_compactness_objective(self):
+        # Slot j is an internal idle when it is free, a class has started before it and
+        # another one is still pending after it. The daily idle count k is then squared
+        # through a unary counter: k_1 >= k_2 >= ... with sum(k_i) == k, so that
+        # sum((2i - 1) * k_i) == k * k. Everything here is O(slots) per section-day.
+        all_daily_sum_squared_terms = []
+        num_slots_in_day = len(self.time_slots)
+        max_daily_idles = max(num_slots_in_day - 2, 0)
+
+        for sec in self.sections:
+            for d in self.days:
+                daily_internal_idle_indicators = []
+                for j in range(1, num_slots_in_day - 1):
+                    is_slot_j_free = self.occupied(sec, d, self.time_slots[j]).Not()
+                    has_class_before_j = self.started(sec, d, j - 1)
+                    has_class_after_j = self.pending(sec, d, j + 1)
+
+                    slot_j_is_internal_idle = self.model.NewBoolVar(f"internalidle_{sec}_{d}_{j}" if self.names else "")
+                    self.model.AddImplication(slot_j_is_internal_idle, is_slot_j_free)
+                    self.model.AddImplication(slot_j_is_internal_idle, has_class_before_j)
+                    self.model.AddImplication(slot_j_is_internal_idle, has_class_after_j)
+                    self.model.AddBoolOr([slot_j_is_internal_idle, is_slot_j_free.Not(), has_class_before_j.Not(), has_class_after_j.Not()])
+                    daily_internal_idle_indicators.append(slot_j_is_internal_idle)
+
+                if not daily_internal_idle_indicators:
+                    continue
+                idle_count_unary = [self.model.NewBoolVar(f"idle_atleast_{sec}_{d}_{i + 1}" if self.names else "") for i in range(max_daily_idles)]
+                for higher, lower in zip(idle_count_unary[1:], idle_count_unary):
+                    self.model.AddImplication(higher, lower)
+                self.model.Add(sum(idle_count_unary) == sum(daily_internal_idle_indicators))
+                all_daily_sum_squared_terms.extend((2 * i + 1) * k for i, k in enumerate(idle_count_unary))
+
+        max_total_penalty = len(self.sections) * len(self.days) * (max_daily_idles ** 2)
+        self.objective = self.model.NewIntVar(0, max_total_penalty if max_total_penalty > 0 else 1, "total_penalty_objective")
+        self.model.Add(self.objective == sum(all_daily_sum_squared_terms))
+        self.model.Minimize(self.objective)
+
+    # ----------------------------
+    # Strengthening
+    # ----------------------------
+    def _add_strengthening(self):
+        for name in STRENGTHENINGS:
+            if name in self.strengthen:
+                getattr(self, f"_add_{name}")()
+
+    def interchangeable_days(self):
+        """Groups of days (in week order) that every constraint treats alike."""
+        problem = self.problem
+        groups = {}
+        for d_id, d in enumerate(self.days):
+            signature = (
+                problem.usable[d_id].tobytes(), problem.classrooms[d_id].tobytes(),
+                problem.labrooms[d_id].tobytes(), problem.unavailable[:, d_id].tobytes(),
+            )
+            groups.setdefault(signature, []).append(d)
+        return [days for days in groups.values() if len(days) > 1]
+
+    def section_signature(self, sec):
+        return tuple(sorted((c, t) for c, t in self.section_course_teacher[sec].items() if t))
+
+    def identical_sections(self):
+        """Groups of sections (in section order) taking the same courses from the same teachers."""
+        groups = {}
+        for sec in self.sections:
+            groups.setdefault(self.section_signature(sec), []).append(sec)
+        return list(groups.values())
+
+    def day_load(self, d, slots):
+        """Weighted number of occupied cells of `d` among `slots`.
+
+        Sections are weighted by their group of identical sections, so the load
+        does not change when identical sections swap timetables, but ties between
+        days are rarer than with a plain count.
+        """
+        terms = []
+        for weight, sections in enumerate(self.identical_sections(), start=1):
+            terms.extend(weight * self.occupied(sec, d, slot) for sec in sections for slot in slots)
+        return sum(terms)
+
+    def _add_day_order(self):
+        # Interchangeable days can be permuted in any timetable; keep the permutation
+        # whose loads do not increase through the week
+        for days in self.interchangeable_days():
+            for earlier, later in zip(days, days[1:]):
+                self.model.Add(self.day_load(earlier, self.time_slots) >= self.day_load(later, self.time_slots))
+
+    def _add_mirror_days(self):
+        # A day whose slots, lab pairs, rooms and teacher availability read the same
+        # backwards can be reversed without changing its idles; keep the half with
+        # the heavier morning. Reversing a day leaves its load, and so day_order, intact.
+        problem = self.problem
+        last = len(self.time_slots) - 1
+        pair_at = {frozenset(problem.slot_id[slot] for slot in pair): p for p, pair in enumerate(self.lab_pairs)}
+        mirrored_pair = [pair_at.get(frozenset(last - problem.slot_id[slot] for slot in pair)) for pair in self.lab_pairs]
+        if None in mirrored_pair:
+            return
+        half = len(self.time_slots) // 2
+        for d_id, d in enumerate(self.days):
+            if not (
+                (problem.usable[d_id] == problem.usable[d_id][::-1]).all()
+                and (problem.classrooms[d_id] == problem.classrooms[d_id][::-1]).all()
+                and (problem.labrooms[d_id] == problem.labrooms[d_id][mirrored_pair]).all()
+                and (problem.unavailable[:, d_id] == problem.unavailable[:, d_id, ::-1]).all()
+            ):
+                continue
+            morning, afternoon = self.time_slots[:half], self.time_slots[-half:]
+            self.model.Add(self.day_load(d, morning) >= self.day_load(d, afternoon))
+
+    def section_vector(self, sec):
+        """Every course literal of `sec`, in a fixed order shared by identical sections."""
+        vector = [self.course_at(sec, c, d, slot) for d in self.days for slot in self.time_slots for c in self.theory_courses[sec]]
+        vector.extend(self.lab_block(sec, c, d, pair) for d in self.days for pair in self.lab_pairs for c in self.lab_courses[sec])
+        return vector
+
+    def add_lex_greater_equal(self, xs, ys):
+        """xs >= ys lexicographically, with one "equal so far" literal per position."""
+        equal = None
+        for i, (x, y) in enumerate(zip(xs, ys)):
+            prefix = [] if equal is None else [equal.Not()]
+            self.model.AddBoolOr(prefix + [x, y.Not()])
+            if i == len(xs) - 1:
+                break
+            # Still equal after position i unless x = 1 and y = 0 there
+            equal_next = self.model.NewBoolVar(f"lex_equal_{i}" if self.names else "")
+            self.model.AddBoolOr(prefix + [x, equal_next])
+            self.model.AddBoolOr(prefix + [y.Not(), equal_next])
+            equal = equal_next
+
+    def _add_section_order(self):
+        # Sections with the same courses and teachers can swap timetables; day loads
+        # weigh them alike, so this ordering is compatible with day_order and mirror_days
+        for sections in self.identical_sections():
+            for earlier, later in zip(sections, sections[1:]):
+                self.add_lex_greater_equal(self.section_vector(earlier), self.section_vector(later))
+
+    def _add_teacher_load(self):
+        # Each teacher's weekly slots, over the literals of the no-double-booking constraints
+        for teacher in self.all_teachers:
+            busy, load = [], 0
+            for sec in self.teacher_sections(teacher):
+                for c in self.teacher_courses[sec][teacher]:
+                    load += 2 * self.lab_course_sessions_needed[c] if c in self.lab_names else self.course_req[c]
+                for d in self.days:
+                    for slot in self.time_slots:
+                        lit = self.teacher_busy(sec, teacher, d, slot)
+                        if lit is not None:
+                            busy.append(lit)
+            self.model.Add(sum(busy) == load)
+
+    def _add_room_load(self):
+        # Rooms over a whole day, next to the per-cell capacities
+        classrooms, labrooms = self.problem.classrooms.tolist(), self.problem.labrooms.tolist()
+        with_theory = [sec for sec in self.sections if self.theory_courses[sec]]
+        with_labs = [sec for sec in self.sections if self.lab_courses[sec]]
+        for d_id, d in enumerate(self.days):
+            if with_theory:
+                theory = [self.in_classroom(sec, d, slot) for sec in with_theory for slot in self.time_slots]
+                self.model.Add(sum(theory) <= sum(classrooms[d_id]))
+            if with_labs:
+                labs = [self.lab_block(sec, c, d, pair) for sec in with_labs for c in self.lab_courses[sec] for pair in self.lab_pairs]
+                self.model.Add(sum(labs) <= sum(labrooms[d_id]))
+
+    def _add_idle_bound(self):
+        # Dropping every other section only relaxes a section's constraints, so the sum of
+        # the sections' best bounds when solved alone bounds the objective from below
+        bound, bounds = 0, {}
+        deadline = time.perf_counter() + IDLE_BOUND_TOTAL_TIME
+        for sec in self.sections:
+            signature = self.section_signature(sec)
+            if signature not in bounds:
+                left = deadline - time.perf_counter()
+                if left <= 0:
+                    bounds[signature] = 0
+                    continue
+                single = dict(self.data, sections=[sec], section_course_teacher={sec: self.section_course_teacher[sec]})
+                solver = cp_model.CpSolver()
+                solver.parameters.num_workers = 1
+                solver.parameters.max_time_in_seconds = min(IDLE_BOUND_TIME_LIMIT, left)
+                status = solver.Solve(TimetableModel(single).build().model)
+                found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+                bounds[signature] = math.ceil(solver.BestObjectiveBound() - 1e-6) if found else 0
+            bound += bounds[signature]
+        if bound > 0:
+            self.model.Add(self.objective >= bound)
+
+    # ----------------------------
+    # Warm start
+    # ----------------------------
+    def add_hints(self, timetable):
+        """Hint every course literal from a previous timetable in the response format.
+
+        Cells whose course/teacher no longer exist in this problem are hinted empty.
+        Returns the hinted (literal, value) pairs so callers can measure acceptance.
+        """
+        hints = {}
+        for sec in self.sections:
+            for d in self.days:
+                cells = timetable.get(sec, {}).get(d, {})
+                for slot in self.time_slots:
+                    cell = cells.get(slot)
+                    if cell is None:
+                        continue
+                    for course, lit in self.cell_courses(sec, d, slot):
+                        # A lab block literal covers two cells; the first one decides its hint
+                        if lit.Index() in hints:
+                            continue
+                        taught = cell["course"] == course and cell["teacher"] == self.section_course_teacher[sec][course]
+                        hints[lit.Index()] = (lit, int(taught))
+        for lit, value in hints.values():
+            self.model.AddHint(lit, value)
+        return list(hints.values())
+
+    def hint_solution(self, values):
+        """Replace every hint with the session literals' values in `values` (a solver or callback)."""
+        self.model.ClearHints()
+        for lit in self.session_literals():
+            self.model.AddHint(lit, values.BooleanValue(lit))
+
+    def previous_course(self, timetable, sec, d, slot):
+        """Course a previous timetable put in (sec, d, slot), "None" if empty, or None if it is no longer valid here."""
+        cell = timetable.get(sec, {}).get(d, {}).get(slot)
+        if cell is None or cell["course"] == "None":
+            return "None"
+        course = cell["course"]
+        if course not in self.teacher_courses[sec].get(cell["teacher"], []):
+            return None
+        if self.course_at(sec, course, d, slot) is None:
+            return None
+        return course
+
+    def fix_cells(self, timetable, sections):
+        """Pin every cell of `sections` to what `timetable` has there."""
+        for sec in sections:
+            for d in self.days:
+                for slot in self.time_slots:
+                    previous = self.previous_course(timetable, sec, d, slot)
+                    for course, lit in self.cell_courses(sec, d, slot):
+                        self.model.Add(lit == int(course == previous))
+
+    def moved_sessions(self, timetable, sections):
+        """One literal per session `timetable` has in `sections`, true when the session does not stay put.
+
+        A theory session is its cell's course literal and a lab session its block
+        literal, so moving a lab counts once although it spans two cells.
+        """
+        moved = {}
+        for sec in sections:
+            for d in self.days:
+                for slot in self.time_slots:
+                    previous = self.previous_course(timetable, sec, d, slot)
+                    if previous is None or previous == "None":
+                        continue  # an empty cell, or an old session that cannot stay and is no choice of the solver
+                    lit = self.course_at(sec, previous, d, slot)
+                    moved.setdefault(lit.Index(), lit.Not())
+        return list(moved.values())
+
+    # ----------------------------
+    # Alternatives
+    # ----------------------------
+    def session_literals(self):
+        """One literal per place a session can take: theory cells and lab blocks."""
+        for sec in self.sections:
+            for d in self.days:
+                for course in self.theory_courses[sec]:
+                    for slot in self.time_slots:
+                        yield self.course_at(sec, course, d, slot)
+                for course in self.lab_courses[sec]:
+                    for pair in self.lab_pairs:
+                        yield self.lab_block(sec, course, d, pair)
+
+    def num_sessions(self):
+        return int(((self.problem.teacher_of >= 0) * self.problem.sessions).sum())
+
+    def exclude(self, values, min_changes=1):
+        """Require at least `min_changes` sessions to sit elsewhere than in the solution in `values`."""
+        kept = [lit for lit in self.session_literals() if values.BooleanValue(lit)]
+        self.model.Add(sum(kept) <= len(kept) - min_changes)
+
+    # ----------------------------
+    # Result extraction
+    # ----------------------------
+    def extraction_table(self):
+        """(session literals, then per covered cell: literal position, section id, day * slots + slot, course id).
+
+        Built on first use and kept, so each solution costs one read per session
+        literal, whichever number of cells the literal covers.
+        """
+        if self._extraction is None:
+            problem = self.problem
+            num_slots = len(self.time_slots)
+            literals, entries = [], []
+            # Straight from the cache: every session literal the build created, nothing new
+            for key, lit in self.lits.items():
+                if key[0] == "course":
+                    _, sec, course, d, slot = key
+                    cells = (slot,)
+                elif key[0] == "lab":
+                    _, sec, course, d, cells = key
+                else:
+                    continue
+                s, c, day = problem.section_id[sec], problem.course_id[course], problem.day_id[d] * num_slots
+                for slot in cells:
+                    entries.append((len(literals), s, day + problem.slot_id[slot], c))
+                literals.append(lit)
+            columns = np.array(entries, dtype=np.int32).reshape(-1, 4).T
+            self._extraction = (literals, *columns)
+        return self._extraction
+
+    def extract_grid(self, values):
+        """Course id (see `problem.courses`) of every (section, day, slot) cell, -1 where empty."""
+        literals, entry_literal, entry_section, entry_cell, entry_course = self.extraction_table()
+        on = np.fromiter((values.BooleanValue(lit) for lit in literals), dtype=bool, count=len(literals))[entry_literal]
+        grid = np.full((len(self.sections), len(self.days) * len(self.time_slots)), -1, dtype=np.int32)
+        grid[entry_section[on], entry_cell[on]] = entry_course[on]
+        return grid.reshape(len(self.sections), len(self.days), len(self.time_slots))
+
+    def extract(self, values):
+        """Build the section -> day -> slot timetable from a solver or solution callback."""
+        courses, teachers = self.problem.courses, self.problem.teachers
+        result = {}
+        for sec, teacher_of, days in zip(self.sections, self.problem.teacher_of.tolist(), self.extract_grid(values).tolist()):
+            result[sec] = {}
+            for d, cells in zip(self.days, days):
+                result[sec][d] = {
+                    slot: {"course": courses[c], "teacher": teachers[teacher_of[c]]} if c >= 0 else {"course": "None", "teacher": ""}
+                    for slot, c in zip(self.time_slots, cells)
+                }
+        return result